@@ -0,0 +1,532 @@
+"""
+Alchemy, CoinGecko, gluex ve Gemini için yerel sahte sunucular.
+
+Tek bir ThreadingHTTPServer path önekine göre yönlendirir:
+    /alchemy/{chain_name}/v2/{api_key}          JSON-RPC (tekil ve batch), Transfer logları ve reorg simülasyonu
+    /coingecko/api/v3/...                       coins/{platform}/contract/{address}, simple/price, simple/token_price
+    /gluex/v1/quote                             swap quote
+    /gemini/v1beta/models/{model}:generateContent
+
+Her upstream için gecikme, hata oranı ve saniye başına istek limiti ayarlanabilir.
+Cüzdan içerikleri adresten deterministik olarak türetilir: adresin son 4 hex hanesi
+cüzdandaki token sayısını verir (bkz. `wallet_address`). `mine_transfer`, `mine_blocks`
+ve `reorg` ile zincir ilerletilip artımlı bakiye takibi test edilebilir.
+"""
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+PLATFORM_BY_CHAIN_NAME = {
+    "eth-mainnet": "ethereum",
+    "eth-sepolia": "ethereum",
+    "polygon-mainnet": "polygon-pos",
+    "arb-mainnet": "arbitrum-one",
+    "bnb-mainnet": "binance-smart-chain",
+    "bnb-testnet": "binance-smart-chain",
+}
+
+NATIVE_PRICES = {
+    "ethereum": 3150.25,
+    "binancecoin": 585.4,
+    "matic-network": 0.52,
+    "avalanche-2": 27.1,
+}
+
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+
+# Sahte zincirde kodu olan tek sözleşme (Disperse); diğer adresler EOA kabul edilir
+DISPERSE_CONTRACT = "0xd152f549545093347a162dce210e7293f1452150"
+BASE_FEE = 12 * 10 ** 9
+
+
+def _topic(address: str) -> str:
+    return "0x" + address.lower()[2:].rjust(64, "0")
+
+
+def wallet_address(token_count: int, index: int = 0) -> str:
+    """
+    Sahte Alchemy'nin `token_count` adet token döndüreceği cüzdan adresi üretir
+    """
+    if not 0 <= token_count <= 0xFFFF:
+        raise ValueError("token_count 0-65535 arasında olmalı")
+    prefix = hashlib.sha1(f"wallet:{index}:{token_count}".encode()).hexdigest()[:36]
+    return f"0x{prefix}{token_count:04x}"
+
+
+def token_count_for(address: str) -> int:
+    try:
+        return int(address[-4:], 16)
+    except ValueError:
+        return 0
+
+
+@dataclass
+class UpstreamProfile:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    rate_limit_per_sec: Optional[float] = None
+
+
+@dataclass
+class FakeConfig:
+    alchemy: UpstreamProfile = field(default_factory=UpstreamProfile)
+    coingecko: UpstreamProfile = field(default_factory=UpstreamProfile)
+    gluex: UpstreamProfile = field(default_factory=UpstreamProfile)
+    gemini: UpstreamProfile = field(default_factory=UpstreamProfile)
+    # Token havuzundaki sözleşmelerin oranları: kalanlar geçerli token
+    spam_ratio: float = 0.6
+    low_trust_ratio: float = 0.1
+    token_pool_size: int = 5000
+    seed: int = 42
+
+
+class _RateLimiter:
+    """Basit token bucket; limit aşılırsa False döner (429 için)"""
+
+    def __init__(self, rate: Optional[float]):
+        self.rate = rate
+        self.tokens = rate or 0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        if not self.rate:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class TokenUniverse:
+    """Deterministik token havuzu: her sözleşme spam, düşük güvenli veya geçerli"""
+
+    def __init__(self, config: FakeConfig):
+        self.config = config
+        self.contracts = [
+            "0x" + hashlib.sha1(f"token:{i}".encode()).hexdigest()
+            for i in range(config.token_pool_size)
+        ]
+        self.index_by_contract = {contract: i for i, contract in enumerate(self.contracts)}
+        spam_cut = int(config.token_pool_size * config.spam_ratio)
+        low_trust_cut = spam_cut + int(config.token_pool_size * config.low_trust_ratio)
+        self.kind_by_index = [
+            "spam" if i < spam_cut else "low_trust" if i < low_trust_cut else "valid"
+            for i in range(config.token_pool_size)
+        ]
+        rng = random.Random(config.seed)
+        rng.shuffle(self.kind_by_index)
+
+    def kind(self, contract: str) -> Optional[str]:
+        index = self.index_by_contract.get(contract.lower())
+        return None if index is None else self.kind_by_index[index]
+
+    def wallet_tokens(self, address: str):
+        count = min(token_count_for(address), len(self.contracts))
+        rng = random.Random(address.lower())
+        contracts = rng.sample(self.contracts, count)
+        return [(contract, rng.randint(1, 10 ** 24)) for contract in contracts]
+
+    def token_metadata(self, contract: str):
+        index = self.index_by_contract[contract.lower()]
+        rng = random.Random(index)
+        return {
+            "symbol": f"tk{index}",
+            "name": f"Token {index}",
+            "decimals": rng.choice((6, 8, 18, 18, 18)),
+            "price": round(rng.uniform(0.0001, 5000), 6),
+        }
+
+
+class FakeUpstreams:
+    def __init__(self, config: FakeConfig = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or FakeConfig()
+        self.universe = TokenUniverse(self.config)
+        self.limiters = {
+            name: _RateLimiter(getattr(self.config, name).rate_limit_per_sec)
+            for name in ("alchemy", "coingecko", "gluex", "gemini")
+        }
+        self.request_counts: Dict[str, int] = {}
+        self._counts_lock = threading.Lock()
+        self.rpc_methods = {
+            "eth_getBalance": self._eth_get_balance,
+            "alchemy_getTokenBalances": self._alchemy_get_token_balances,
+            "eth_blockNumber": self._eth_block_number,
+            "eth_getBlockByNumber": self._eth_get_block_by_number,
+            "eth_getLogs": self._eth_get_logs,
+            "eth_call": self._eth_call,
+            "eth_getCode": self._eth_get_code,
+            "eth_getTransactionCount": self._eth_get_transaction_count,
+            "eth_gasPrice": self._eth_gas_price,
+            "eth_maxPriorityFeePerGas": self._eth_max_priority_fee_per_gas,
+            "eth_estimateGas": self._eth_estimate_gas,
+        }
+        # Zincir durumu: head bloğu, reorg sayacı (blok hash'lerini değiştirir), Transfer logları
+        self.head = 20_000_000
+        self.fork_id = 0
+        self.transfer_logs = []
+        self.balance_deltas: Dict[tuple, int] = {}
+        self._chain_lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self) -> Dict[str, str]:
+        """Uygulamayı bu sahte sunuculara yönlendiren çevre değişkenleri"""
+        return {
+            "RPC_KEY": "bench",
+            "COINGECKO_API_KEY": "bench",
+            "SWAP_API_KEY": "bench",
+            "GEMINI_API_KEY": "bench",
+            "ALCHEMY_URL_TEMPLATE": f"{self.base_url}/alchemy/{{chain_name}}/v2/{{api_key}}",
+            "COINGECKO_API_URL": f"{self.base_url}/coingecko/api/v3",
+            "GLUEX_API_URL": f"{self.base_url}/gluex/v1",
+            "GEMINI_API_ENDPOINT": f"{self.base_url}/gemini",
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # --- Zincir simülasyonu ---
+
+    def mine_blocks(self, count: int = 1):
+        with self._chain_lock:
+            self.head += count
+
+    def mine_transfer(self, contract: str, sender: str, recipient: str, amount: int):
+        """Yeni bir blokta ERC-20 Transfer üretir ve bakiyeleri günceller"""
+        contract, sender, recipient = contract.lower(), sender.lower(), recipient.lower()
+        with self._chain_lock:
+            self.head += 1
+            self.transfer_logs.append({
+                "address": contract,
+                "topics": [TRANSFER_TOPIC, _topic(sender), _topic(recipient)],
+                "data": "0x" + format(amount, "064x"),
+                "blockNumber": hex(self.head),
+                "removed": False,
+            })
+            self.balance_deltas[(sender, contract)] = self.balance_deltas.get((sender, contract), 0) - amount
+            self.balance_deltas[(recipient, contract)] = self.balance_deltas.get((recipient, contract), 0) + amount
+
+    def reorg(self):
+        """Tüm blok hash'lerini değiştirir; takip edilen son bloklar geçersiz olur"""
+        with self._chain_lock:
+            self.fork_id += 1
+
+    def block_hash(self, number: int) -> str:
+        return "0x" + hashlib.sha256(f"{self.fork_id}:{number}".encode()).hexdigest()
+
+    # --- İstek yönlendirme ---
+
+    def _handler_class(self):
+        fakes = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Keep-alive bağlantılarda başlık ve gövde ayrı yazıldığı için Nagle gecikmesini kapat
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                fakes._dispatch(self, "GET")
+
+            def do_POST(self):
+                fakes._dispatch(self, "POST")
+
+        return Handler
+
+    def _dispatch(self, handler: BaseHTTPRequestHandler, method: str):
+        parsed = urlparse(handler.path)
+        upstream = parsed.path.strip("/").split("/", 1)[0]
+        length = int(handler.headers.get("Content-Length") or 0)
+        body = handler.rfile.read(length) if length else b""
+
+        routes = {
+            "alchemy": self._handle_alchemy,
+            "coingecko": self._handle_coingecko,
+            "gluex": self._handle_gluex,
+            "gemini": self._handle_gemini,
+        }
+        if upstream not in routes:
+            return self._send(handler, 404, {"error": "unknown upstream"})
+
+        with self._counts_lock:
+            self.request_counts[upstream] = self.request_counts.get(upstream, 0) + 1
+
+        profile: UpstreamProfile = getattr(self.config, upstream)
+        if not self.limiters[upstream].allow():
+            return self._send(handler, 429, {"error": "rate limited"})
+        delay = profile.latency_ms + (random.uniform(0, profile.jitter_ms) if profile.jitter_ms else 0)
+        if delay:
+            time.sleep(delay / 1000)
+        if profile.error_rate and random.random() < profile.error_rate:
+            return self._send(handler, 500, {"error": "injected failure"})
+
+        try:
+            status, payload = routes[upstream](method, parsed, body)
+        except Exception as e:
+            status, payload = 500, {"error": str(e)}
+        self._send(handler, status, payload)
+
+    @staticmethod
+    def _send(handler: BaseHTTPRequestHandler, status: int, payload):
+        data = json.dumps(payload).encode()
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    # --- Alchemy ---
+
+    def _handle_alchemy(self, method, parsed, body):
+        parts = parsed.path.strip("/").split("/")
+        chain_name = parts[1] if len(parts) > 1 else ""
+        if chain_name not in PLATFORM_BY_CHAIN_NAME:
+            return 404, {"error": f"unknown network {chain_name}"}
+        request = json.loads(body or b"null")
+        if isinstance(request, list):
+            return 200, [self._rpc_call(chain_name, item) for item in request]
+        return 200, self._rpc_call(chain_name, request)
+
+    def _rpc_call(self, chain_name, request):
+        handler = self.rpc_methods.get(request.get("method"))
+        if handler is None:
+            return {"jsonrpc": "2.0", "id": request.get("id"),
+                    "error": {"code": -32601, "message": "Method not found"}}
+        return {"jsonrpc": "2.0", "id": request.get("id"),
+                "result": handler(chain_name, request.get("params") or [])}
+
+    def _eth_get_balance(self, chain_name, params):
+        address = params[0].lower()
+        rng = random.Random(f"native:{chain_name}:{address}")
+        return hex(rng.randint(0, 50 * 10 ** 18))
+
+    def _alchemy_get_token_balances(self, chain_name, params):
+        address = params[0].lower()
+        balances = dict(self.universe.wallet_tokens(address))
+        with self._chain_lock:
+            for (holder, contract), delta in self.balance_deltas.items():
+                if holder == address:
+                    balances[contract] = balances.get(contract, 0) + delta
+        return {
+            "address": address,
+            "tokenBalances": [
+                {"contractAddress": contract, "tokenBalance": hex(balance)}
+                for contract, balance in balances.items()
+            ],
+        }
+
+    def _eth_block_number(self, chain_name, params):
+        return hex(self.head)
+
+    def _eth_get_block_by_number(self, chain_name, params):
+        tag = params[0]
+        number = self.head if tag == "latest" else int(tag, 16)
+        if number > self.head:
+            return None
+        return {"number": hex(number), "hash": self.block_hash(number), "parentHash": self.block_hash(number - 1),
+                "baseFeePerGas": hex(BASE_FEE)}
+
+    def _eth_get_logs(self, chain_name, params):
+        query = params[0]
+        from_block = int(query.get("fromBlock", "0x0"), 16)
+        to_block = self.head if query.get("toBlock", "latest") == "latest" else int(query["toBlock"], 16)
+        topics = query.get("topics") or []
+        with self._chain_lock:
+            logs = list(self.transfer_logs)
+        return [
+            log for log in logs
+            if from_block <= int(log["blockNumber"], 16) <= to_block
+            and all(expected is None or expected == actual for expected, actual in zip(topics, log["topics"]))
+        ]
+
+    def _token_balance(self, contract, holder):
+        balance = dict(self.universe.wallet_tokens(holder)).get(contract, 0)
+        with self._chain_lock:
+            return balance + self.balance_deltas.get((holder, contract), 0)
+
+    def _eth_call(self, chain_name, params):
+        call = params[0]
+        contract = call["to"].lower()
+        data = call.get("data") or call.get("input") or "0x"
+        selector = data[2:10]
+        if selector == "313ce567":  # decimals()
+            decimals = self.universe.token_metadata(contract)["decimals"] if self.universe.kind(contract) else 18
+            return "0x" + format(decimals, "064x")
+        if selector == "70a08231":  # balanceOf(address)
+            holder = "0x" + data[-40:]
+            return "0x" + format(self._token_balance(contract, holder), "064x")
+        if selector == "dd62ed3e":  # allowance(address,address)
+            return "0x" + format(0, "064x")
+        return "0x"
+
+    def _eth_get_code(self, chain_name, params):
+        return "0x6080604052" if params[0].lower() == DISPERSE_CONTRACT else "0x"
+
+    def _eth_get_transaction_count(self, chain_name, params):
+        return hex(random.Random(f"nonce:{chain_name}:{params[0].lower()}").randint(0, 500))
+
+    def _eth_gas_price(self, chain_name, params):
+        return hex(BASE_FEE + 10 ** 9)
+
+    def _eth_max_priority_fee_per_gas(self, chain_name, params):
+        return hex(10 ** 9)
+
+    def _eth_estimate_gas(self, chain_name, params):
+        data = params[0].get("data") or "0x"
+        if data == "0x":
+            return hex(21000)
+        selector = data[2:10]
+        # Dinamik dizilerin uzunluğu = alıcı sayısı (calldata'daki 32 byte'lık kelime sayısından)
+        words = (len(data) - 10) // 64
+        if selector == "e63d38ed":  # disperseEther
+            return hex(30000 + 9500 * ((words - 4) // 2))
+        if selector == "c73a2d60":  # disperseToken
+            return hex(45000 + 30000 * ((words - 5) // 2))
+        return hex(51000 if selector == "a9059cbb" else 46000)
+
+    # --- CoinGecko ---
+
+    def _handle_coingecko(self, method, parsed, body):
+        path = parsed.path.split("/api/v3/", 1)[-1]
+        query = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+
+        match = re.fullmatch(r"coins/([^/]+)/contract/(0x[0-9a-fA-F]+)", path)
+        if match:
+            return self._coin_by_contract(match.group(1), match.group(2))
+        if path == "simple/price":
+            return self._simple_price(query)
+        match = re.fullmatch(r"simple/token_price/([^/]+)", path)
+        if match:
+            return self._token_price(query)
+        return 404, {"error": "Not Found"}
+
+    def _coin_by_contract(self, platform, contract):
+        kind = self.universe.kind(contract)
+        if kind is None or kind == "spam":
+            return 404, {"error": "coin not found"}
+        meta = self.universe.token_metadata(contract)
+        green = 1 if kind == "low_trust" else 4
+        return 200, {
+            "id": meta["name"].lower().replace(" ", "-"),
+            "symbol": meta["symbol"],
+            "name": meta["name"],
+            "image": {"small": f"https://assets.example/{meta['symbol']}.png"},
+            "detail_platforms": {platform: {"decimal_place": meta["decimals"], "contract_address": contract}},
+            "market_data": {
+                "current_price": {"usd": meta["price"]},
+                "market_cap": {"usd": meta["price"] * 1_000_000},
+                "price_change_percentage_24h": 1.5,
+            },
+            "tickers": [{"trust_score": "green"}] * green + [{"trust_score": "yellow"}] * (5 - green),
+        }
+
+    def _token_price(self, query):
+        # Evrendeki token'lar kendi fiyatıyla, diğerleri (token listesindekiler) adresten türetilen fiyatla
+        prices = {}
+        for contract in query.get("contract_addresses", "").lower().split(","):
+            if not contract or self.universe.kind(contract) == "spam":
+                continue
+            kind = self.universe.kind(contract)
+            price = self.universe.token_metadata(contract)["price"] if kind else round(random.Random(contract).uniform(0.5, 5000), 4)
+            prices[contract] = {"usd": price, "usd_market_cap": price * 1_000_000, "usd_24h_change": 0.4}
+        return 200, prices
+
+    def _simple_price(self, query):
+        ids = [coin_id for coin_id in query.get("ids", "").split(",") if coin_id]
+        return 200, {
+            coin_id: {"usd": NATIVE_PRICES[coin_id], "usd_market_cap": NATIVE_PRICES[coin_id] * 1e8,
+                      "usd_24h_change": -0.8}
+            for coin_id in ids if coin_id in NATIVE_PRICES
+        }
+
+    # --- gluex ---
+
+    def _handle_gluex(self, method, parsed, body):
+        request = json.loads(body or b"{}")
+        input_amount = int(request.get("inputAmount") or 0)
+        output_amount = input_amount * 3
+        return 200, {
+            "statusCode": 200,
+            "result": {
+                "inputAmount": str(input_amount),
+                "outputAmount": str(output_amount),
+                "effectiveInputAmount": str(input_amount),
+                "effectiveOutputAmount": str(output_amount),
+                "minOutputAmount": str(output_amount * 99 // 100),
+                "inputAmountUSD": 100.0,
+                "outputAmountUSD": 99.7,
+                "effectiveInputAmountUSD": 100.0,
+                "effectiveOutputAmountUSD": 99.7,
+                "estimatedNetSurplus": "0",
+                "router": "0x6ec7612828b776cc746fe0ee5381bc93878ad3f4",
+                "calldata": "0x" + "ab" * 512,
+                "value": "0",
+                "computationUnits": 350000,
+                "gasPrice": "1000000000",
+            },
+        }
+
+    # --- Gemini ---
+
+    def _handle_gemini(self, method, parsed, body):
+        request = json.loads(body or b"{}")
+        prompt = "".join(
+            part.get("text", "")
+            for content in request.get("contents", [])
+            for part in content.get("parts", [])
+        )
+        answer = {
+            "transaction_type": "merge",
+            "chain": "ethereum",
+            "token_type": "USDT",
+            "amount": "12.3456",
+            "destination_wallet_address": "0x" + "1" * 40,
+            "multi_send_wallets": [],
+            "source_wallet_address": "",
+            "source_token": "",
+            "receive_token": "",
+            "slippage_tolerance": "",
+            "user_response": f"Merging USDT into your wallet ({len(prompt)} prompt chars).",
+        }
+        return 200, {
+            "candidates": [{
+                "content": {"parts": [{"text": "```json\n" + json.dumps(answer) + "\n```"}], "role": "model"},
+                "finishReason": "STOP",
+                "index": 0,
+                "safetyRatings": [],
+            }],
+            "promptFeedback": {"safetyRatings": []},
+        }
@@ -0,0 +1,286 @@
+"""
+FastAPI uygulamasını yerel sahte upstream'lere karşı ayağa kaldırıp yük testi yapar.
+
+Örnek:
+    python -m benchmarks.run --scenarios get-info,price,chat --concurrency 1,8,32 --duration 10
+    python -m benchmarks.run --wallet-tokens 1000 --alchemy-latency 80 --coingecko-rate-limit 30
+    python -m benchmarks.run --compare benchmarks/results/20250101-120000.json
+
+Sonuçlar benchmarks/results/ altına JSON olarak kaydedilir; `--compare` ile önceki bir
+çalıştırmaya göre değişim yazdırılır.
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import requests
+
+from benchmarks.fakes import FakeConfig, FakeUpstreams, UpstreamProfile, wallet_address
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+class AppServer:
+    """Uygulamayı ayrı bir süreçte (yük üreticisiyle GIL paylaşmadan) çalıştırır"""
+
+    def __init__(self, env: Dict[str, str], workers: int = 1):
+        self.port = _free_port()
+        self.workers = workers
+        self.env = {**os.environ, **env, "PYTHONPATH": str(REPO_ROOT)}
+        # token_cache.json gibi dosyalar her çalıştırmada temiz bir dizine yazılsın
+        self.workdir = tempfile.TemporaryDirectory(prefix="aidefi-bench-")
+        self.process = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self):
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+             "--port", str(self.port), "--workers", str(self.workers), "--log-level", "warning"],
+            cwd=self.workdir.name,
+            env=self.env,
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Uygulama başlatılamadı (exit code {self.process.returncode})")
+            try:
+                if requests.get(f"{self.base_url}/health", timeout=1).status_code == 200:
+                    return self
+            except requests.RequestException:
+                time.sleep(0.1)
+        raise RuntimeError("Uygulama 30 saniyede ayağa kalkmadı")
+
+    def __exit__(self, *exc):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self.workdir.cleanup()
+
+
+def build_scenarios(args) -> Dict[str, Callable[[int], dict]]:
+    """Senaryo adı -> (istek sırası -> {method, path, json}) üreticisi"""
+    wallets = [wallet_address(args.wallet_tokens, i) for i in range(args.wallets)]
+    wallet_data = {
+        address: {
+            "ETH": {"balance": "1.5", "sortIndex": index},
+            "USDT": {"balance": "250.123456", "sortIndex": index},
+        }
+        for index, address in enumerate(wallets)
+    }
+
+    return {
+        "get-info": lambda i: {
+            "method": "POST", "path": "/rpc/get-info",
+            "json": {"addresses": wallets, "chain": args.chain},
+        },
+        "price": lambda i: {
+            "method": "POST", "path": "/rpc/price",
+            "json": {
+                "inputToken": "0xdAC17F958D2ee523a2206206994597C13D831ec7",
+                "outputToken": "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2",
+                "inputAmount": str(10 ** 8 + i),
+                "userAddress": wallets[0],
+                "chainID": "ethereum",
+                "slippage": 0.5,
+            },
+        },
+        "chat": lambda i: {
+            "method": "POST", "path": "/ai/chat",
+            "json": {"message": "Collect all my USDT into my first wallet", "wallet_data": wallet_data},
+        },
+    }
+
+
+def run_level(base_url: str, make_request: Callable[[int], dict], concurrency: int, duration: float,
+              max_requests: int = None) -> dict:
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(10 ** 12))
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def worker():
+        nonlocal errors
+        session = requests.Session()
+        local_latencies = []
+        local_errors = 0
+        while time.perf_counter() < stop_at:
+            with lock:
+                index = next(counter)
+            if max_requests is not None and index >= max_requests:
+                break
+            spec = make_request(index)
+            start = time.perf_counter()
+            try:
+                response = session.request(spec["method"], base_url + spec["path"], json=spec.get("json"), timeout=300)
+                ok = response.status_code < 400
+            except requests.RequestException:
+                ok = False
+            local_latencies.append(time.perf_counter() - start)
+            if not ok:
+                local_errors += 1
+        with lock:
+            latencies.extend(local_latencies)
+            errors += local_errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def compare(current: dict, baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {(r["scenario"], r["concurrency"]): r for r in baseline["results"]}
+
+    print(f"\nKarşılaştırma: {baseline_path} ({baseline['meta'].get('git_commit')})")
+    print(f"{'scenario':<10} {'conc':>5} {'rps':>16} {'p50 ms':>18} {'p99 ms':>18}")
+    for result in current["results"]:
+        old = previous.get((result["scenario"], result["concurrency"]))
+        if not old:
+            continue
+
+        def change(key):
+            before, after = old[key], result[key]
+            delta = f"{(after - before) / before * 100:+.1f}%" if before else "n/a"
+            return f"{after:>9} ({delta})"
+
+        print(f"{result['scenario']:<10} {result['concurrency']:>5} {change('throughput_rps'):>16} "
+              f"{change('p50_ms'):>18} {change('p99_ms'):>18}")
+
+
+def _profile(latency, jitter, error_rate, rate_limit) -> UpstreamProfile:
+    return UpstreamProfile(latency_ms=latency, jitter_ms=jitter, error_rate=error_rate, rate_limit_per_sec=rate_limit)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="aidefi-backend benchmark ve yük testi")
+    parser.add_argument("--scenarios", default="get-info,price,chat")
+    parser.add_argument("--concurrency", default="1,4,16")
+    parser.add_argument("--duration", type=float, default=10.0, help="Her eşzamanlılık seviyesi için saniye")
+    parser.add_argument("--max-requests", type=int, default=None, help="Seviye başına istek üst sınırı")
+    parser.add_argument("--warmup", type=int, default=1, help="Ölçümden önce senaryo başına istek sayısı")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker sayısı")
+    parser.add_argument("--chain", type=int, default=1)
+    parser.add_argument("--wallets", type=int, default=3, help="get-info isteğindeki cüzdan sayısı")
+    parser.add_argument("--wallet-tokens", type=int, default=100, help="Cüzdan başına token sayısı (1-1000)")
+    parser.add_argument("--spam-ratio", type=float, default=0.6)
+    parser.add_argument("--low-trust-ratio", type=float, default=0.1)
+    for upstream in ("alchemy", "coingecko", "gluex", "gemini"):
+        parser.add_argument(f"--{upstream}-latency", type=float, default=0.0, help="ms")
+        parser.add_argument(f"--{upstream}-jitter", type=float, default=0.0, help="ms")
+        parser.add_argument(f"--{upstream}-error-rate", type=float, default=0.0)
+        parser.add_argument(f"--{upstream}-rate-limit", type=float, default=None, help="istek/sn")
+    parser.add_argument("--output", default=None, help="Sonuç dosyası (varsayılan: benchmarks/results/<zaman>.json)")
+    parser.add_argument("--compare", default=None, help="Karşılaştırılacak önceki sonuç dosyası")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = FakeConfig(
+        spam_ratio=args.spam_ratio,
+        low_trust_ratio=args.low_trust_ratio,
+        **{
+            upstream: _profile(
+                getattr(args, f"{upstream}_latency"), getattr(args, f"{upstream}_jitter"),
+                getattr(args, f"{upstream}_error_rate"), getattr(args, f"{upstream}_rate_limit"),
+            )
+            for upstream in ("alchemy", "coingecko", "gluex", "gemini")
+        },
+    )
+    scenario_names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    levels = [int(level) for level in args.concurrency.split(",")]
+    scenarios = build_scenarios(args)
+    unknown = set(scenario_names) - set(scenarios)
+    if unknown:
+        raise SystemExit(f"Bilinmeyen senaryo: {', '.join(sorted(unknown))}")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "args": vars(args),
+        },
+        "results": [],
+    }
+
+    with FakeUpstreams(config) as fakes, AppServer(fakes.env(), workers=args.workers) as app:
+        for name in scenario_names:
+            make_request = scenarios[name]
+            for i in range(args.warmup):
+                spec = make_request(i)
+                requests.request(spec["method"], app.base_url + spec["path"], json=spec.get("json"), timeout=300)
+            for level in levels:
+                result = {"scenario": name, **run_level(app.base_url, make_request, level, args.duration, args.max_requests)}
+                report["results"].append(result)
+                print(f"{name:<10} c={level:<4} {result['throughput_rps']:>8} req/s  "
+                      f"p50={result['p50_ms']}ms p95={result['p95_ms']}ms p99={result['p99_ms']}ms "
+                      f"errors={result['errors']}/{result['requests']}")
+        report["meta"]["upstream_requests"] = dict(fakes.request_counts)
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSonuçlar kaydedildi: {output}")
+
+    if args.compare:
+        compare(report, args.compare)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,91 @@
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
 
 from modules.ai.controller import router as ai_router
 from modules.rpc.controller import router as rpc_router
+from modules.multisend.controller import router as multisend_router
+from modules.transaction.controller import router as transaction_router
+from modules.rpc.service import REQUIRED_ENV
+from modules.metrics.controller import router as metrics_router
+from modules.metrics.middleware import MetricsMiddleware
+from modules.profiling.controller import router as profiling_router
+from modules.profiling.middleware import ProfilingMiddleware
+from modules.core.providers import providers
 load_dotenv()
 
+# Upstream -> gerekli çevre değişkeni; eksik olanlar /health'te "degraded" olarak raporlanır
+PROVIDER_ENV = {**REQUIRED_ENV, "gemini": "GEMINI_API_KEY"}
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Client, cache ve thread pool'lar ilk kullanımda oluşturulur; burada sadece kapatılır
+    yield
+    providers.shutdown()
 
-app.add_middleware(
-    CORSMiddleware,
-    # allow_origins=[FRONTEND_URL], 
-    allow_origins=["*"], 
-    allow_credentials=True,
-    allow_methods=["*"], 
-    allow_headers=["*"], 
-)
 
-app.include_router(ai_router, prefix="/ai", tags=["AI"])
-app.include_router(rpc_router, prefix="/rpc", tags=["RPC"])
+def create_app(preload: bool = None) -> FastAPI:
+    """
+    Uygulama fabrikası.
 
-@app.get("/")
-async def root():
-    """Ana endpoint"""
-    return {"message": "Welcome to the DeFi Transaction Assistant API"}
+    preload=True (veya PRELOAD_APP=1) fork ile paylaşılabilen saf veri provider'larını
+    (ör. token fiyat cache'i) hemen yükler; `gunicorn --preload` ile master süreçte bir kez
+    yüklenip worker'lara paylaşılır. Soket, thread ve gRPC tutan provider'lar her zaman
+    worker içinde ilk kullanımda oluşturulur.
+    """
+    if preload is None:
+        preload = os.environ.get("PRELOAD_APP", "").lower() in ("1", "true", "yes")
 
-@app.get("/health")
-async def health_check():
-    """Sağlık kontrolü endpoint'i"""
-    return {"status": "healthy", "service": "DeFi Transaction Assistant"}
+    app = FastAPI(lifespan=lifespan)
+
+    app.add_middleware(
+        CORSMiddleware,
+        # allow_origins=[FRONTEND_URL],
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    app.add_middleware(MetricsMiddleware)
+    # PROFILE_SAMPLE_RATE veya PROFILE_TOKEN ile açılır; kapalıyken sadece header kontrolü yapar
+    app.add_middleware(ProfilingMiddleware)
+
+    app.include_router(ai_router, prefix="/ai", tags=["AI"])
+    app.include_router(rpc_router, prefix="/rpc", tags=["RPC"])
+    app.include_router(multisend_router, prefix="/multisend", tags=["Multisend"])
+    app.include_router(transaction_router, prefix="/transaction", tags=["Transaction"])
+    app.include_router(metrics_router, tags=["Metrics"])
+    app.include_router(profiling_router, tags=["Debug"])
+
+    @app.get("/")
+    async def root():
+        """Ana endpoint"""
+        return {"message": "Welcome to the DeFi Transaction Assistant API"}
+
+    @app.get("/health")
+    async def health_check():
+        """Sağlık kontrolü endpoint'i"""
+        missing = {name: env for name, env in PROVIDER_ENV.items() if not os.getenv(env)}
+        return {
+            "status": "degraded" if missing else "healthy",
+            "service": "DeFi Transaction Assistant",
+            "providers": {
+                name: f"missing {missing[name]}" if name in missing else "configured"
+                for name in PROVIDER_ENV
+            },
+        }
+
+    if preload:
+        providers.preload()
+
+    return app
+
+
+app = create_app()
 
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=int(os.environ.get("APP_PORT", 8000)), reload=True)
-
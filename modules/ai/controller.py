@@ -5,21 +5,27 @@ import google.generativeai as genai
 from dotenv import load_dotenv
 
 from modules.classes.service import ChatResponse, ChatRequest, TransactionData, MultiSendWallet, UnifiedAIAgent, WalletData
+from modules.core.providers import providers, require_env
 
 # Çevre değişkenlerini yükle
 load_dotenv()
 
-# API anahtarını çevre değişkenlerinden al
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    raise ValueError("GEMINI_API_KEY environment variable is required")
+router = APIRouter()
 
-genai.configure(api_key=GEMINI_API_KEY)
+def _create_unified_agent() -> UnifiedAIAgent:
+    # API anahtarını çevre değişkenlerinden al; genai ilk chat isteğinde yapılandırılır
+    gemini_api_key = require_env("GEMINI_API_KEY")
 
-router = APIRouter()
+    # Benchmark/test ortamında yerel sahte Gemini sunucusuna yönlendirmek için (ör. http://127.0.0.1:9000/gemini)
+    gemini_api_endpoint = os.getenv("GEMINI_API_ENDPOINT")
+    if gemini_api_endpoint:
+        genai.configure(api_key=gemini_api_key, transport="rest", client_options={"api_endpoint": gemini_api_endpoint})
+    else:
+        genai.configure(api_key=gemini_api_key)
+    return UnifiedAIAgent()
 
-# Tek unified agent'ı başlat
-unified_agent = UnifiedAIAgent()
+# Tek unified agent; gRPC kanalı fork sonrası paylaşılamayacağı için her worker kendi agent'ını oluşturur
+unified_agent_provider = providers.register("gemini_agent", _create_unified_agent)
 
 import re
 
@@ -51,7 +57,7 @@ async def chat_endpoint(request: ChatRequest):
         # print(f"Current Wallet Data: {wallet_data}")
         
         # TEK API ÇAĞRISI ile tüm işlemleri gerçekleştir
-        final_response, updated_transaction_data = await unified_agent.process_message(
+        final_response, updated_transaction_data = await unified_agent_provider.get().process_message(
             request.message, 
             wallet_data,
             current_transaction_data
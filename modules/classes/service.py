@@ -3,6 +3,10 @@ import json
 from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, Field
 
+from modules.metrics.service import track_upstream, LLM_PROMPT_SIZE, LLM_JSON_PARSE_FAILURES
+from modules.rpc.service import CHAIN_IDS, NATIVE_SYMBOLS
+from modules.tokenlist.service import get_token_index
+
 
 class WalletData(BaseModel):
     address: Optional[List[str]] = None
@@ -39,6 +43,7 @@ class ChatResponse(BaseModel):
 # Tek AI Agent sınıfı - tüm işlemleri tek seferde yapar
 class UnifiedAIAgent:
     def __init__(self, model_name: str = "gemini-1.5-flash"):
+        self.model_name = model_name
         self.model = genai.GenerativeModel(model_name)
 
     async def process_message(self, message: str, current_wallet_data: WalletData , current_transaction_data: TransactionData = None) -> tuple[str, TransactionData]:
@@ -109,7 +114,9 @@ class UnifiedAIAgent:
             """
 
         try:
-            response = self.model.generate_content(system_message)
+            LLM_PROMPT_SIZE.observe(len(system_message), model=self.model_name)
+            with track_upstream("gemini", "generate_content"):
+                response = self.model.generate_content(system_message)
             result = response.text.strip()
             
             # JSON response'u parse et
@@ -155,9 +162,10 @@ class UnifiedAIAgent:
                 
                 user_response = parsed_response.get("user_response", "I'm here to help with your DeFi transactions!")
                 
-                return user_response, updated_transaction_data
+                return user_response, normalize_tickers(updated_transaction_data)
                 
             except json.JSONDecodeError:
+                LLM_JSON_PARSE_FAILURES.inc(model=self.model_name)
                 # JSON parse edilemezse fallback response
                 return "I'm processing your request. Could you please provide more details about your transaction?", current_data
                 
@@ -165,6 +173,30 @@ class UnifiedAIAgent:
             # print(f"Error in unified processing: {e}")
             return "Sorry, I encountered an error. Please try again.", current_data
         
+def normalize_tickers(data: TransactionData) -> TransactionData:
+    """
+    LLM'in döndürdüğü ticker'ları ("usdt", "$eth" gibi) yerel token listesindeki
+    sembollere çevirir; listede olmayanlara dokunmaz
+    """
+    chain_id = CHAIN_IDS.get((data.chain or "").strip().lower())
+    if chain_id is None:
+        return data
+
+    token_index = get_token_index()
+    native_symbol = NATIVE_SYMBOLS.get(chain_id)
+    updates = {}
+    for field in ("token_type", "source_token", "receive_token"):
+        value = getattr(data, field)
+        if not value:
+            continue
+        if value.strip().lstrip("$").upper() == native_symbol:
+            updates[field] = native_symbol
+            continue
+        token = token_index.by_symbol(chain_id, value)
+        if token is not None:
+            updates[field] = token.symbol
+    return data.model_copy(update=updates) if updates else data
+
 def sort_and_clean_wallet_data(data):
     """
     Wallet verisini sortIndex'e göre sıralar ve sortIndex değerlerini siler
@@ -0,0 +1,109 @@
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from typing import Callable, Dict, Hashable, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from modules.profiling.service import run_in_profile
+
+# Tek bir upstream çağrısının en uzun süresi (önceden her yerde sabit 10 saniye)
+UPSTREAM_TIMEOUT = float(os.getenv("UPSTREAM_TIMEOUT", 10))
+# Bütçe bitmek üzereyken başlayan çağrılara tanınan en kısa süre; sonuç arka planda cache'e yazılabilsin diye
+MIN_UPSTREAM_TIMEOUT = float(os.getenv("MIN_UPSTREAM_TIMEOUT", 5))
+
+
+class Deadline:
+    """İstek başına gecikme bütçesi (monotonic saat ile)"""
+    __slots__ = ("budget", "expires_at")
+
+    def __init__(self, budget: float):
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar("deadline", default=None)
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]):
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+
+def request_deadline(requested_ms: Optional[int], default_ms: int, max_ms: int) -> Deadline:
+    """İstemcinin istediği bütçe (ms), sunucu üst sınırıyla kırpılır; verilmemişse sunucu varsayılanı"""
+    budget_ms = default_ms if requested_ms is None or requested_ms <= 0 else min(requested_ms, max_ms)
+    return Deadline(budget_ms / 1000)
+
+
+def upstream_timeout(cap: float = None) -> float:
+    """
+    Upstream çağrıları için timeout: aktif isteğin kalan bütçesi, en fazla `cap`
+    (varsayılan UPSTREAM_TIMEOUT), en az MIN_UPSTREAM_TIMEOUT.
+    """
+    cap = UPSTREAM_TIMEOUT if cap is None else cap
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return cap
+    return min(cap, max(deadline.remaining(), MIN_UPSTREAM_TIMEOUT))
+
+
+def submit_in_context(executor: ThreadPoolExecutor, fn: Callable, *args) -> Future:
+    """Görevi çağıranın context'i (deadline ve profil dahil) ile çalıştırır"""
+    return executor.submit(copy_context().run, run_in_profile, fn, *args)
+
+
+async def run_blocking(fn: Callable, *args):
+    """
+    Bloklayan servis çağrısını event loop dışında (threadpool) çalıştırır; böylece
+    bekleyen istekler birbirini sıraya sokmaz ve her isteğin bütçesi kendi süresini ölçer.
+    Context (deadline, profil) thread'e taşınır.
+    """
+    return await run_in_threadpool(run_in_profile, fn, *args)
+
+
+class InflightTasks:
+    """
+    Aynı anahtar için devam eden görevi paylaşır: bütçesi biten bir isteğin arka planda
+    süren sorgusu, sonraki istekler tarafından tekrar başlatılmadan beklenir.
+    """
+
+    def __init__(self):
+        self._futures: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, executor: ThreadPoolExecutor, key: Hashable, fn: Callable, *args) -> Future:
+        with self._lock:
+            future = self._futures.get(key)
+            if future is not None:
+                return future
+            future = submit_in_context(executor, fn, *args)
+            self._futures[key] = future
+        future.add_done_callback(lambda done: self._discard(key, done))
+        return future
+
+    def _discard(self, key: Hashable, future: Future):
+        with self._lock:
+            if self._futures.get(key) is future:
+                del self._futures[key]
+
+    def __len__(self):
+        return len(self._futures)
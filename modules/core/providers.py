@@ -0,0 +1,145 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Generic, List, Optional, TypeVar
+
+import requests
+from requests.adapters import HTTPAdapter
+
+T = TypeVar("T")
+
+
+class MissingEnvError(ValueError):
+    """Gerekli çevre değişkeni tanımlı değil (istemci hatası değil, sunucu yapılandırma hatası)"""
+
+
+def require_env(name: str) -> str:
+    """
+    Çevre değişkenini döndürür, yoksa MissingEnvError fırlatır.
+    Import anında değil, değişken ilk kullanıldığında çağrılır.
+    """
+    value = os.getenv(name)
+    if not value:
+        raise MissingEnvError(f"{name} environment variable is not set. Please set it in the .env file.")
+    return value
+
+
+class LazyProvider(Generic[T]):
+    """
+    İlk kullanımda oluşturulan paylaşılan nesne (HTTP session, thread pool, cache, LLM client...).
+
+    fork_safe=True olan nesneler (saf veri) gunicorn --preload ile master süreçte
+    oluşturulup worker'lara fork ile paylaşılabilir; diğerleri (soket, thread, gRPC)
+    her worker'da fork sonrası sıfırlanır ve yeniden oluşturulur.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], T], close: Callable[[T], None] = None, fork_safe: bool = False):
+        self.name = name
+        self.factory = factory
+        self.close_func = close
+        self.fork_safe = fork_safe
+        self._instance: Optional[T] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._instance is not None
+
+    def get(self) -> T:
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self.factory()
+                instance = self._instance
+        return instance
+
+    def close(self):
+        with self._lock:
+            instance, self._instance = self._instance, None
+        if instance is not None and self.close_func:
+            try:
+                self.close_func(instance)
+            except Exception as e:
+                print(f"{self.name} kapatılırken hata: {e}")
+
+    def reset_after_fork(self):
+        # Parent'taki lock kilitli kopyalanmış olabilir; child'da yenisini kullan
+        self._lock = threading.Lock()
+        if not self.fork_safe:
+            # Parent'ın soketlerini/thread'lerini kapatmadan bırak, child kendi nesnesini oluşturur
+            self._instance = None
+
+
+class ProviderRegistry:
+    def __init__(self):
+        self._providers: Dict[str, LazyProvider] = {}
+
+    def register(self, name: str, factory: Callable[[], T], close: Callable[[T], None] = None, fork_safe: bool = False) -> LazyProvider[T]:
+        if name in self._providers:
+            raise ValueError(f"Provider zaten kayıtlı: {name}")
+        provider = LazyProvider(name, factory, close, fork_safe)
+        self._providers[name] = provider
+        return provider
+
+    def preload(self) -> List[str]:
+        """
+        Fork ile paylaşılabilecek provider'ları önceden yükler (gunicorn --preload için).
+        Hata veren provider'lar atlanır; ilk istekte tekrar denenir.
+        """
+        loaded = []
+        for provider in self._providers.values():
+            if not provider.fork_safe:
+                continue
+            try:
+                provider.get()
+                loaded.append(provider.name)
+            except Exception as e:
+                print(f"{provider.name} önceden yüklenemedi: {e}")
+        return loaded
+
+    def shutdown(self):
+        for provider in reversed(list(self._providers.values())):
+            provider.close()
+
+    def reset_after_fork(self):
+        for provider in self._providers.values():
+            provider.reset_after_fork()
+
+    def status(self) -> Dict[str, bool]:
+        return {name: provider.loaded for name, provider in self._providers.items()}
+
+
+providers = ProviderRegistry()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=providers.reset_after_fork)
+
+
+def _create_http_session() -> requests.Session:
+    # Upstream'lere keep-alive bağlantıları tekrar kullanmak için süreç başına tek session
+    session = requests.Session()
+    pool_size = int(os.getenv("HTTP_POOL_SIZE", 64))
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _create_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(
+        max_workers=int(os.getenv("UPSTREAM_POOL_SIZE", 32)),
+        thread_name_prefix="upstream",
+    )
+
+
+http_session_provider = providers.register("http_session", _create_http_session, close=lambda s: s.close())
+executor_provider = providers.register("executor", _create_executor, close=lambda e: e.shutdown(wait=False))
+
+
+def get_http_session() -> requests.Session:
+    return http_session_provider.get()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    return executor_provider.get()
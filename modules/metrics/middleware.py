@@ -0,0 +1,49 @@
+import time
+
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from modules.metrics.service import HTTP_REQUEST_DURATION, HTTP_REQUESTS_IN_FLIGHT, ensure_snapshot_writer
+
+
+def _route_template(app, scope: Scope) -> str:
+    """
+    Label kardinalitesini sınırlı tutmak için ham path yerine route şablonunu döndürür
+    """
+    router = getattr(app, "router", None)
+    for route in getattr(router, "routes", []):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        ensure_snapshot_writer()
+        method = scope["method"]
+        route = _route_template(scope.get("app"), scope)
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc(method=method, route=route)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec(method=method, route=route)
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start, method=method, route=route, status=str(status_code)
+            )
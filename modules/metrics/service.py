@@ -0,0 +1,488 @@
+import fcntl
+import glob
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import orjson
+
+from modules.core.providers import providers
+from modules.profiling.service import current_profile
+
+# Prometheus varsayılan bucket'ları, upstream timeout'larımızı (10s) kapsayacak şekilde genişletildi
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# LLM prompt uzunluğu (karakter) için bucket'lar
+PROMPT_SIZE_BUCKETS = (1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000)
+
+# gunicorn ile birden fazla worker çalışırken her worker değerlerini bu dizine yazar;
+# /metrics'e cevap veren worker tüm dosyaları birleştirir. Tanımlı değilse tek süreç varsayılır.
+MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR")
+MULTIPROC_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", 5))
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames: Sequence[str], labelvalues: Sequence[str], extra: Tuple[str, str] = None) -> str:
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(f'{extra[0]}="{_escape_label(extra[1])}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} metriği için beklenen label'lar: {self.labelnames}, gelen: {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def snapshot(self) -> list:
+        with self._lock:
+            return [[list(labelvalues), self._copy_value(value)] for labelvalues, value in self._values.items()]
+
+    def _copy_value(self, value):
+        return value
+
+    def merge(self, snapshots: List[Tuple[list, bool]]) -> Dict[Tuple[str, ...], object]:
+        """
+        Worker snapshot'larını (değerler, süreç hâlâ çalışıyor mu) birleştirir. Sayaçlar
+        ölen worker'ların değerlerini de toplar ki worker yeniden başladığında geri gitmesin.
+        """
+        merged = {}
+        for items, _ in snapshots:
+            for labelvalues, value in items:
+                key = tuple(labelvalues)
+                merged[key] = merged[key] + value if key in merged else value
+        return merged
+
+    def render(self, values: Dict[Tuple[str, ...], object] = None) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        if values is None:
+            with self._lock:
+                items = list(self._values.items())
+        else:
+            items = list(values.items())
+        for labelvalues, value in items:
+            lines.extend(self._render_sample(labelvalues, value))
+        return lines
+
+    def _render_sample(self, labelvalues, value) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    metric_type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), multiprocess_mode: str = "sum"):
+        super().__init__(name, documentation, labelnames)
+        # Worker'lar arası birleştirme: "sum" (ör. in-flight istekler) veya "max" (her worker'da aynı olan değerler)
+        if multiprocess_mode not in ("sum", "max"):
+            raise ValueError(f"Geçersiz multiprocess_mode: {multiprocess_mode}")
+        self.multiprocess_mode = multiprocess_mode
+
+    def merge(self, snapshots: List[Tuple[list, bool]]) -> Dict[Tuple[str, ...], object]:
+        # Ölen worker'ların anlık değerleri artık geçerli değil
+        merged = {}
+        combine = max if self.multiprocess_mode == "max" else (lambda a, b: a + b)
+        for items, alive in snapshots:
+            if not alive:
+                continue
+            for labelvalues, value in items:
+                key = tuple(labelvalues)
+                merged[key] = combine(merged[key], value) if key in merged else value
+        return merged
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [bucket sayaçları..., +Inf sayacı, toplam]
+                state = [0] * (len(self.buckets) + 1) + [0.0]
+                self._values[key] = state
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[index] += 1
+                    break
+            else:
+                state[len(self.buckets)] += 1
+            state[-1] += value
+
+    def _copy_value(self, state):
+        return list(state)
+
+    def merge(self, snapshots: List[Tuple[list, bool]]) -> Dict[Tuple[str, ...], object]:
+        merged = {}
+        for items, _ in snapshots:
+            for labelvalues, state in items:
+                key = tuple(labelvalues)
+                if key in merged:
+                    merged[key] = [a + b for a, b in zip(merged[key], state)]
+                else:
+                    merged[key] = list(state)
+        return merged
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _render_sample(self, labelvalues, state) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), state[:-1]):
+            cumulative += count
+            labels = _format_labels(self.labelnames, labelvalues, ("le", _format_value(bound)))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, labelvalues)
+        lines.append(f"{self.name}_sum{labels} {_format_value(state[-1])}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class MetricsRegistry:
+    def __init__(self, multiproc_dir: str = None):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+        self.multiproc_dir = multiproc_dir
+        self._snapshot_lock = threading.Lock()
+        # (pid, başlangıç zamanı): PID'i yeniden kullanan yeni worker ölen worker'ın dosyasını ezmesin
+        self._worker_key: Optional[Tuple[int, int]] = None
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metrik zaten kayıtlı: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (), multiprocess_mode: str = "sum") -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames, multiprocess_mode))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], None]):
+        """
+        Scrape anında çağrılacak fonksiyon ekler (ör. cache boyutlarını gauge'lara yazmak için)
+        """
+        self._collectors.append(collector)
+
+    def _run_collectors(self):
+        for collector in list(self._collectors):
+            try:
+                collector()
+            except Exception as e:
+                print(f"Metrik collector hatası: {e}")
+
+    def _current_worker_key(self) -> Tuple[int, int]:
+        pid = os.getpid()
+        if self._worker_key is None or self._worker_key[0] != pid:
+            # Fork sonrası (ör. --preload) her worker kendi anahtarını alır
+            self._worker_key = (pid, time.time_ns())
+        return self._worker_key
+
+    def write_snapshot(self):
+        """Bu worker'ın değerlerini paylaşılan dizine yazar (atomik)"""
+        self._run_collectors()
+        with self._lock:
+            metrics = list(self._metrics.values())
+        pid, started = self._current_worker_key()
+        data = orjson.dumps({"pid": pid, "started": started, "metrics": {metric.name: metric.snapshot() for metric in metrics}})
+        os.makedirs(self.multiproc_dir, exist_ok=True)
+        path = os.path.join(self.multiproc_dir, f"metrics_{pid}_{started}.json")
+        temp_path = f"{path}.tmp"
+        # Writer thread ile /metrics isteği aynı geçici dosyaya yazmasın
+        with self._snapshot_lock:
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+
+    def _read_snapshot(self, path: str) -> Optional[dict]:
+        try:
+            with open(path, "rb") as f:
+                return orjson.loads(f.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, orjson.JSONDecodeError) as e:
+            print(f"Metrik dosyası okunamadı ({path}): {e}")
+            return None
+
+    def _collect_snapshots(self) -> Tuple[Optional[dict], List[dict]]:
+        """
+        Canlı worker snapshot'larını döndürür. Ölen worker'ların (süreci olmayan ya da aynı
+        PID'le daha yeni bir worker'ı olan) sayaç/histogram değerleri metrics_dead.json'a
+        eklenip dosyaları silinir; böylece her scrape'te okunan dosya sayısı worker sayısıyla sınırlı kalır.
+        """
+        dead_path = os.path.join(self.multiproc_dir, "metrics_dead.json")
+        with open(os.path.join(self.multiproc_dir, "metrics.lock"), "w") as lock_file:
+            # Aynı anda scrape eden iki worker ölen dosyayı iki kez eklemesin
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            snapshots = []
+            for path in glob.glob(os.path.join(self.multiproc_dir, "metrics_*_*.json")):
+                snapshot = self._read_snapshot(path)
+                if snapshot is not None:
+                    snapshots.append((path, snapshot))
+
+            newest_start = {}
+            for _, snapshot in snapshots:
+                newest_start[snapshot["pid"]] = max(newest_start.get(snapshot["pid"], 0), snapshot["started"])
+            own_pid = os.getpid()
+            live, dead = [], []
+            for path, snapshot in snapshots:
+                pid = snapshot["pid"]
+                alive = snapshot["started"] == newest_start[pid] and (pid == own_pid or _pid_alive(pid))
+                (live if alive else dead).append((path, snapshot))
+
+            compacted = self._read_snapshot(dead_path)
+            if dead:
+                compacted = {"metrics": self._compact([compacted] + [snapshot for _, snapshot in dead])}
+                temp_path = f"{dead_path}.tmp"
+                with open(temp_path, "wb") as f:
+                    f.write(orjson.dumps(compacted))
+                os.replace(temp_path, dead_path)
+                for path, _ in dead:
+                    os.unlink(path)
+        return compacted, [snapshot for _, snapshot in live]
+
+    def _compact(self, snapshots: List[Optional[dict]]) -> dict:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        result = {}
+        for metric in metrics:
+            # Ölen worker'ın gauge değerleri anlamsızdır; sadece birikimli değerler saklanır
+            if isinstance(metric, Gauge):
+                continue
+            values = metric.merge([(snapshot["metrics"].get(metric.name, []), False) for snapshot in snapshots if snapshot])
+            result[metric.name] = [[list(labelvalues), value] for labelvalues, value in values.items()]
+        return result
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        if not self.multiproc_dir:
+            self._run_collectors()
+            for metric in metrics:
+                lines.extend(metric.render())
+            return "\n".join(lines) + "\n"
+
+        # Cevap veren worker'ın kendi değerleri güncel olsun; diğerleri en fazla MULTIPROC_FLUSH_INTERVAL geride
+        self.write_snapshot()
+        compacted, live = self._collect_snapshots()
+        snapshots = [(snapshot["metrics"], True) for snapshot in live]
+        if compacted is not None:
+            snapshots.append((compacted["metrics"], False))
+        for metric in metrics:
+            values = metric.merge([(worker.get(metric.name, []), alive) for worker, alive in snapshots])
+            lines.extend(metric.render(values))
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry(MULTIPROC_DIR)
+
+
+class SnapshotWriter:
+    """Worker'ın değerlerini periyodik olarak METRICS_MULTIPROC_DIR'e yazan arka plan thread'i"""
+
+    def __init__(self, registry: MetricsRegistry, interval: float = MULTIPROC_FLUSH_INTERVAL):
+        self.registry = registry
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-snapshot", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._write()
+
+    def _write(self):
+        try:
+            self.registry.write_snapshot()
+        except Exception as e:
+            print(f"Metrik snapshot yazılamadı: {e}")
+
+    def close(self):
+        self._stop.set()
+        # Kapanan worker'ın son sayaç değerleri kaybolmasın
+        self._write()
+
+
+# Thread içerdiği için her worker fork sonrası kendi writer'ını başlatır
+snapshot_writer_provider = providers.register("metrics_snapshot_writer", lambda: SnapshotWriter(registry), close=lambda writer: writer.close())
+
+
+def ensure_snapshot_writer():
+    if registry.multiproc_dir:
+        snapshot_writer_provider.get()
+
+# HTTP katmanı
+HTTP_REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+)
+HTTP_REQUESTS_IN_FLIGHT = registry.gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being served",
+    ["method", "route"],
+)
+
+# Upstream servisler (alchemy, coingecko, gluex, gemini)
+UPSTREAM_REQUEST_DURATION = registry.histogram(
+    "upstream_request_duration_seconds",
+    "Latency of calls to upstream providers",
+    ["upstream", "operation"],
+)
+UPSTREAM_ERRORS = registry.counter(
+    "upstream_errors_total",
+    "Failed upstream calls by reason (exception type or HTTP status)",
+    ["upstream", "operation", "reason"],
+)
+
+# Fiyat cache'i
+PRICE_LOOKUPS = registry.counter(
+    "coingecko_contract_lookups_total",
+    "Contract price lookups by outcome: api_call, skipped_from_cache or token_list (batched, metadata from the local token list)",
+    ["chain", "source"],
+)
+SPAM_CONTRACTS_FILTERED = registry.counter(
+    "spam_contracts_filtered_total",
+    "Token balances dropped by the persistent spam filter before pricing",
+    ["chain"],
+)
+BALANCE_REFRESHES = registry.counter(
+    "balance_refreshes_total",
+    "Wallet balance refreshes by mode (incremental, unchanged or full_<reason>)",
+    ["chain", "mode"],
+)
+TOKEN_CACHE_ENTRIES = registry.gauge(
+    "token_cache_entries",
+    "Entries held in the daily token price cache",
+    ["kind"],
+    # Her worker aynı cache dosyasını yükler; toplamak değeri worker sayısıyla çarpardı
+    multiprocess_mode="max",
+)
+PARTIAL_RESULTS = registry.counter(
+    "partial_results_total",
+    "Incomplete lookups in a returned response, by kind (wallet or token still running at the deadline, wallet_error for failed balance lookups)",
+    ["endpoint", "kind"],
+)
+
+# LLM
+LLM_PROMPT_SIZE = registry.histogram(
+    "llm_prompt_size_chars",
+    "Size of prompts sent to the LLM in characters",
+    ["model"],
+    buckets=PROMPT_SIZE_BUCKETS,
+)
+LLM_JSON_PARSE_FAILURES = registry.counter(
+    "llm_json_parse_failures_total",
+    "LLM responses that could not be parsed as JSON",
+    ["model"],
+)
+
+
+class UpstreamCall:
+    __slots__ = ("upstream", "operation", "status")
+
+    def __init__(self, upstream: str, operation: str):
+        self.upstream = upstream
+        self.operation = operation
+        self.status: Optional[int] = None
+
+
+@contextmanager
+def track_upstream(upstream: str, operation: str):
+    """
+    Upstream çağrısını ölçer. HTTP durum kodu `call.status`'a yazılırsa
+    4xx/5xx yanıtlar da hata olarak sayılır. İstek profilleniyorsa çağrı span olarak eklenir.
+    """
+    call = UpstreamCall(upstream, operation)
+    start = time.perf_counter()
+    error = None
+    try:
+        yield call
+    except Exception as e:
+        error = type(e).__name__
+        UPSTREAM_ERRORS.inc(upstream=upstream, operation=operation, reason=error)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        UPSTREAM_REQUEST_DURATION.observe(elapsed, upstream=upstream, operation=operation)
+        profile = current_profile()
+        if profile is not None:
+            profile.add_span("upstream", f"{upstream}:{operation}", start, elapsed, error or call.status)
+    if call.status is not None and call.status >= 400:
+        UPSTREAM_ERRORS.inc(upstream=upstream, operation=operation, reason=f"http_{call.status}")
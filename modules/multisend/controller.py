@@ -0,0 +1,40 @@
+import os
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import ORJSONResponse
+
+from modules.core.deadline import run_blocking
+from modules.multisend.service import DEFAULT_MAX_ERRORS, MultisendCsvParser
+
+router = APIRouter()
+
+MAX_CSV_BYTES = int(os.getenv("MULTISEND_CSV_MAX_BYTES", 50 * 1024 * 1024))
+# Ayrıştırma threadpool'da yapılır; küçük parçalar thread geçişi başına bu boyuta kadar biriktirilir
+FEED_BYTES = 256 * 1024
+
+
+@router.post("/csv")
+async def upload_csv(request: Request, decimals: int = 18, max_errors: int = DEFAULT_MAX_ERRORS):
+    """
+    Multisend alıcı listesini CSV olarak alır (istek gövdesi dosyanın kendisi, ör. text/csv).
+    Her satır "adres,miktar"; isteğe bağlı başlık satırı atlanır. Gövde parça parça işlenir.
+    Dönen multi_send_wallets ve multisend_amount doğrudan transaction_data'ya yazılabilir.
+    Ayrıştırma (checksum doğrulaması dahil) event loop'u bloklamamak için threadpool'da çalışır.
+    """
+    parser = MultisendCsvParser(decimals=decimals, max_errors=max_errors)
+    received = 0
+    buffer = bytearray()
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > MAX_CSV_BYTES:
+                raise HTTPException(status_code=413, detail=f"CSV file exceeds {MAX_CSV_BYTES} bytes")
+            buffer += chunk
+            if len(buffer) >= FEED_BYTES:
+                await run_blocking(parser.feed, bytes(buffer))
+                buffer.clear()
+        if buffer:
+            await run_blocking(parser.feed, bytes(buffer))
+        result = await run_blocking(parser.finish)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return ORJSONResponse(result)
@@ -0,0 +1,146 @@
+import codecs
+import csv
+from decimal import Context, Decimal, InvalidOperation
+from typing import Dict, List, Optional
+
+from modules.core.address import address_error
+
+DEFAULT_MAX_ERRORS = 100
+MAX_LINE_LENGTH = 64 * 1024
+
+# Varsayılan 28 basamaklık Decimal hassasiyeti 18 ondalıklı büyük toplamlarda yuvarlama yapar
+SUM_CONTEXT = Context(prec=100)
+
+
+class MultisendCsvParser:
+    """
+    Multisend alıcı listesini (adres, miktar) parça parça okuyan CSV ayrıştırıcı.
+
+    Dosyanın tamamı belleğe alınmaz: gelen her parça satırlara bölünür, yarım kalan
+    son satır bir sonraki parçaya eklenir. Bellekte sadece tekil alıcılar ve ilk
+    `max_errors` hata tutulur. Miktarlar Decimal ile toplandığı için toplam kesindir;
+    aynı adres birden fazla geçerse miktarları birleştirilir.
+    """
+
+    def __init__(self, decimals: int = 18, max_errors: int = DEFAULT_MAX_ERRORS):
+        self.decimals = decimals
+        self.max_errors = max_errors
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+        self._remainder = ""
+        self.row_count = 0
+        self.error_count = 0
+        self.errors: List[dict] = []
+        self.duplicate_count = 0
+        self.duplicates: List[dict] = []
+        self.total = Decimal(0)
+        # küçük harf adres -> [ilk görülen adres, toplam miktar]
+        self.recipients: Dict[str, list] = {}
+
+    def feed(self, chunk: bytes):
+        text = self._remainder + self._decoder.decode(chunk)
+        lines = text.splitlines(keepends=True)
+        # Son satır \n ile bitmiyorsa (\r\n'in yarısı dahil) bir sonraki parçada tamamlanacak
+        if lines and not lines[-1].endswith("\n"):
+            self._remainder = lines.pop()
+            if len(self._remainder) > MAX_LINE_LENGTH:
+                raise ValueError(f"CSV line longer than {MAX_LINE_LENGTH} characters")
+        else:
+            self._remainder = ""
+        self._parse_lines(lines)
+
+    def finish(self) -> dict:
+        tail = self._remainder + self._decoder.decode(b"", final=True)
+        self._remainder = ""
+        if tail:
+            self._parse_lines([tail])
+        return self.result()
+
+    def _parse_lines(self, lines: List[str]):
+        for line in lines:
+            self.row_count += 1
+            # Tırnaksız satırlar (neredeyse hepsi) elle bölünür; csv.reader sadece tırnaklı satırlar için
+            if '"' in line:
+                row = next(csv.reader([line]), [])
+                if not row or all(not cell.strip() for cell in row):
+                    continue
+            elif not line.replace(",", "").strip():
+                continue
+            else:
+                row = line.rstrip("\r\n").split(",")
+            self._parse_row(self.row_count, row)
+
+    def _parse_row(self, row_number: int, row: List[str]):
+        if len(row) < 2:
+            return self._add_error(row_number, "expected address and amount columns", ",".join(row))
+
+        address = row[0].strip()
+        amount_text = row[1].strip()
+
+        # İlk satır başlık olabilir (ör. "address,amount")
+        if row_number == 1 and not address.lower().startswith("0x"):
+            return
+
+        error = address_error(address)
+        if error:
+            return self._add_error(row_number, error, address)
+
+        amount = self._parse_amount(amount_text)
+        if isinstance(amount, str):
+            return self._add_error(row_number, amount, amount_text)
+
+        key = address.lower()
+        existing = self.recipients.get(key)
+        if existing is None:
+            self.recipients[key] = [address, amount]
+        else:
+            existing[1] = SUM_CONTEXT.add(existing[1], amount)
+            self.duplicate_count += 1
+            if len(self.duplicates) < self.max_errors:
+                self.duplicates.append({"row": row_number, "address": address})
+        self.total = SUM_CONTEXT.add(self.total, amount)
+
+    def _parse_amount(self, amount_text: str):
+        """Geçerli miktar için Decimal, geçersizse hata mesajı döndürür"""
+        try:
+            amount = Decimal(amount_text)
+        except InvalidOperation:
+            return "invalid amount"
+        if not amount.is_finite():
+            return "invalid amount"
+        if amount <= 0:
+            return "amount must be positive"
+        # Düz ondalık yazımda basamak sayısı metinden okunur (as_tuple() satır başına ~1µs)
+        _, _, fraction = amount_text.partition(".")
+        places = len(fraction) if fraction.isdigit() else -amount.as_tuple().exponent
+        if places > self.decimals:
+            return f"amount has more than {self.decimals} decimal places"
+        return amount
+
+    def _add_error(self, row_number: int, message: str, value: Optional[str]):
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"row": row_number, "error": message, "value": value})
+
+    def result(self) -> dict:
+        return {
+            "status": "success" if not self.error_count else "error",
+            "row_count": self.row_count,
+            "recipient_count": len(self.recipients),
+            "multisend_amount": _format_decimal(self.total),
+            "multi_send_wallets": [
+                {"destination_wallet_address": address, "destination_wallet_amount": _format_decimal(amount)}
+                for address, amount in self.recipients.values()
+            ],
+            "duplicate_count": self.duplicate_count,
+            "duplicates": self.duplicates,
+            "error_count": self.error_count,
+            "errors": self.errors,
+        }
+
+
+def _format_decimal(value: Decimal) -> str:
+    # Bilimsel gösterim (1E+3 gibi) yerine düz ondalık yazım
+    text = format(value, "f")
+    if "." in text:
+        text = text.rstrip("0").rstrip(".")
+    return text or "0"
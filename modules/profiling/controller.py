@@ -0,0 +1,37 @@
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+
+from modules.profiling.middleware import token_matches
+from modules.profiling.service import get_profiler
+
+router = APIRouter()
+
+
+def _authorize(x_profile_token: Optional[str]):
+    # Profiller path'leri, stack'leri ve upstream sürelerini gösterir; PROFILE_TOKEN tanımlı değilse hiç okunamaz
+    if not token_matches(x_profile_token or ""):
+        raise HTTPException(status_code=403, detail="Invalid profile token")
+
+
+@router.get("/debug/profiles")
+async def list_profiles(min_ms: float = 0, limit: int = 20, x_profile_token: Optional[str] = Header(default=None)):
+    """Son saklanan profiller (en yenisi önce), isteğe bağlı olarak süreye göre filtrelenir"""
+    _authorize(x_profile_token)
+    return ORJSONResponse([profile.summary() for profile in get_profiler().recent(min_ms, limit)])
+
+
+@router.get("/debug/profiles/{profile_id}")
+async def profile_detail(profile_id: str, format: str = "json", x_profile_token: Optional[str] = Header(default=None)):
+    """
+    Profil detayı: upstream/disk span'leri, en sık stack'ler ve fonksiyon bazlı süreler.
+    format=folded flamegraph.pl / speedscope için folded stack metni döndürür.
+    """
+    _authorize(x_profile_token)
+    profile = get_profiler().get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "folded":
+        return PlainTextResponse(profile.folded())
+    return ORJSONResponse(profile.to_dict())
@@ -0,0 +1,71 @@
+import hmac
+import os
+import random
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from modules.profiling.service import PROFILE_SAMPLE_RATE, PROFILE_SLOW_MS, Profile, get_profiler
+
+PROFILE_HEADER = b"x-profile-token"
+# Profilleme ve profil okuma endpoint'leri kendileri profillenmez
+EXCLUDED_PREFIXES = ("/metrics", "/debug/", "/health")
+
+
+def profile_token() -> str:
+    return os.getenv("PROFILE_TOKEN", "")
+
+
+def token_matches(value: str) -> bool:
+    token = profile_token()
+    return bool(token) and bool(value) and hmac.compare_digest(value.encode(), token.encode())
+
+
+class ProfilingMiddleware:
+    """
+    İsteklerin PROFILE_SAMPLE_RATE oranını, ya da geçerli X-Profile-Token header'ı
+    taşıyan istekleri örnekleyici profiler altında çalıştırır. Header ile istenen
+    profiller her zaman saklanır ve id'si X-Profile-Id header'ında döner; rastgele
+    örneklenenler sadece PROFILE_SLOW_MS'i aştıysa saklanır. Saklanan profiller
+    /debug/profiles'tan sadece PROFILE_TOKEN ile okunabilir.
+    """
+
+    def __init__(self, app: ASGIApp, sample_rate: float = PROFILE_SAMPLE_RATE, slow_ms: float = PROFILE_SLOW_MS):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"].startswith(EXCLUDED_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        requested = token_matches(_header(scope, PROFILE_HEADER))
+        if not requested and not (self.sample_rate > 0 and random.random() < self.sample_rate):
+            await self.app(scope, receive, send)
+            return
+
+        profiler = get_profiler()
+        profile = Profile(scope["method"], scope["path"], "requested" if requested else "sampled")
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if requested:
+                    message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile.id.encode())]
+            await send(message)
+
+        try:
+            with profiler.scope(profile, label="request"):
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            keep = requested or profile.duration_ms >= self.slow_ms
+            profiler.finish(profile, status_code, keep)
+
+
+def _header(scope: Scope, name: bytes) -> str:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return ""
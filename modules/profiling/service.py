@@ -0,0 +1,308 @@
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+from modules.core.providers import providers
+
+# Rastgele profillenecek istek oranı (0 = kapalı, 1 = hepsi)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+# Stack örnekleme aralığı; GIL geçiş aralığının (5ms) altı pratikte daha sık örnek vermez
+PROFILE_INTERVAL = int(os.getenv("PROFILE_INTERVAL_MS", 5)) / 1000
+# Rastgele örneklenen isteklerden sadece bu süreyi aşanlar saklanır; header ile istenenler her zaman
+PROFILE_SLOW_MS = int(os.getenv("PROFILE_SLOW_MS", 1000))
+PROFILE_BUFFER_SIZE = int(os.getenv("PROFILE_BUFFER_SIZE", 50))
+MAX_STACK_DEPTH = 128
+MAX_SPANS = 1000
+TOP_STACKS = 50
+TOP_FUNCTIONS = 30
+
+_THREAD_SUFFIX = re.compile(r"_\d+$")
+
+
+class Span:
+    __slots__ = ("kind", "name", "thread", "start", "duration", "status")
+
+    def __init__(self, kind: str, name: str, thread: str, start: float, duration: float, status):
+        self.kind = kind
+        self.name = name
+        self.thread = thread
+        self.start = start
+        self.duration = duration
+        self.status = status
+
+    def to_dict(self) -> dict:
+        return {
+            "kind": self.kind,
+            "name": self.name,
+            "thread": self.thread,
+            "start_ms": round(self.start * 1000, 2),
+            "duration_ms": round(self.duration * 1000, 2),
+            "status": self.status,
+        }
+
+
+class Profile:
+    """Tek bir isteğin örneklenmiş stack'leri (folded format) ve upstream/disk span'leri"""
+
+    def __init__(self, method: str, path: str, reason: str, interval: float = PROFILE_INTERVAL):
+        self.id = uuid.uuid4().hex[:16]
+        self.method = method
+        self.path = path
+        self.reason = reason
+        self.interval = interval
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.status: Optional[int] = None
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self.spans: List[Span] = []
+        self.dropped_spans = 0
+
+    @property
+    def finished(self) -> bool:
+        return self.duration is not None
+
+    @property
+    def duration_ms(self) -> float:
+        duration = self.duration if self.duration is not None else time.perf_counter() - self.start
+        return round(duration * 1000, 2)
+
+    def add_sample(self, stack: str):
+        # Sadece örnekleyici thread, Profiler lock'u altında yazar
+        self.samples[stack] += 1
+        self.sample_count += 1
+
+    def add_span(self, kind: str, name: str, start: float, duration: float, status=None):
+        if self.finished:
+            # Yanıt döndükten sonra arka planda biten çağrılar profile eklenmez
+            return
+        if len(self.spans) >= MAX_SPANS:
+            self.dropped_spans += 1
+            return
+        thread = _THREAD_SUFFIX.sub("", threading.current_thread().name)
+        self.spans.append(Span(kind, name, thread, start - self.start, duration, status))
+
+    def folded(self) -> str:
+        """flamegraph.pl / speedscope ile açılabilen folded stack çıktısı"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common()) + "\n"
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "reason": self.reason,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "samples": self.sample_count,
+            "upstream_ms": round(sum(span.duration for span in self.spans if span.kind == "upstream") * 1000, 2),
+        }
+
+    def to_dict(self) -> dict:
+        interval_ms = self.interval * 1000
+        self_samples = Counter()
+        for stack, count in self.samples.items():
+            self_samples[stack.rsplit(";", 1)[-1]] += count
+        return {
+            **self.summary(),
+            "interval_ms": interval_ms,
+            "spans": [span.to_dict() for span in sorted(self.spans, key=lambda span: span.start)],
+            "dropped_spans": self.dropped_spans,
+            # Yaklaşık duvar saati süresi = örnek sayısı * aralık
+            "stacks": [
+                {"stack": stack, "samples": count, "approx_ms": round(count * interval_ms, 1)}
+                for stack, count in self.samples.most_common(TOP_STACKS)
+            ],
+            "self_time": [
+                {"function": function, "samples": count, "approx_ms": round(count * interval_ms, 1)}
+                for function, count in self_samples.most_common(TOP_FUNCTIONS)
+            ],
+        }
+
+
+_current_profile: ContextVar[Optional[Profile]] = ContextVar("profile", default=None)
+
+
+def current_profile() -> Optional[Profile]:
+    return _current_profile.get()
+
+
+class Profiler:
+    """
+    Düşük maliyetli, duvar saati bazlı örnekleyici profiler.
+
+    Profillenen isteklerin çalıştığı thread'ler (event loop, run_blocking ile çalışan
+    threadpool thread'leri ve submit_in_context ile iş alan executor thread'leri) kayıt edilir; tek bir arka plan thread'i bunların
+    stack'lerini `sys._current_frames()` ile PROFILE_INTERVAL aralıkla okur. Bekleyen
+    (upstream, disk) thread'ler de örneklendiği için süre CPU ile sınırlı değildir.
+    Kayıtlı thread yokken örnekleyici uyur; profillenmeyen isteklere maliyeti yoktur.
+
+    Event loop thread'inde bloklayarak çalışan controller'lar için loop thread'inin
+    örnekleri profilli isteğe yazılır; eşzamanlı profilli istekler aynı loop'ta iç içe
+    geçerse loop örnekleri en son başlayan isteğe düşer.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL, buffer_size: int = PROFILE_BUFFER_SIZE):
+        self.interval = interval
+        self._threads: Dict[int, Tuple[Profile, str]] = {}
+        self._lock = threading.Lock()
+        self._has_work = threading.Event()
+        self._stopped = False
+        self._sampler: Optional[threading.Thread] = None
+        self._recent = deque(maxlen=buffer_size)
+        self._labels: Dict[object, str] = {}
+
+    def _ensure_sampler(self):
+        if self._sampler is None:
+            with self._lock:
+                if self._sampler is None and not self._stopped:
+                    self._sampler = threading.Thread(target=self._run, name="profiler", daemon=True)
+                    self._sampler.start()
+
+    def attach(self, profile: Profile, label: str = None) -> Optional[Tuple[Profile, str]]:
+        """Çağıran thread'i profile bağlar; önceki kaydı döndürür (detach ile geri yüklenir)"""
+        self._ensure_sampler()
+        ident = threading.get_ident()
+        label = label or _THREAD_SUFFIX.sub("", threading.current_thread().name)
+        with self._lock:
+            previous = self._threads.get(ident)
+            self._threads[ident] = (profile, label)
+            self._has_work.set()
+        return previous
+
+    def detach(self, profile: Profile, previous: Optional[Tuple[Profile, str]] = None):
+        ident = threading.get_ident()
+        with self._lock:
+            current = self._threads.get(ident)
+            if current is None or current[0] is not profile:
+                # Thread bu arada başka bir profile geçti (iç içe geçen istekler)
+                return
+            if previous is not None and not previous[0].finished:
+                self._threads[ident] = previous
+            else:
+                self._threads.pop(ident, None)
+
+    @contextmanager
+    def scope(self, profile: Profile, label: str = None):
+        """Profili context'e yazar ve çağıran thread'i örneklemeye ekler"""
+        token = _current_profile.set(profile)
+        previous = self.attach(profile, label)
+        try:
+            yield profile
+        finally:
+            self.detach(profile, previous)
+            _current_profile.reset(token)
+
+    def finish(self, profile: Profile, status: Optional[int], keep: bool):
+        with self._lock:
+            profile.duration = time.perf_counter() - profile.start
+            profile.status = status
+            # Arka planda süren görevlerin thread kayıtları da bırakılır
+            for ident in [ident for ident, (owner, _) in self._threads.items() if owner is profile]:
+                del self._threads[ident]
+            if keep:
+                self._recent.append(profile)
+
+    def recent(self, min_ms: float = 0, limit: int = 20) -> List[Profile]:
+        with self._lock:
+            profiles = list(self._recent)
+        return [profile for profile in reversed(profiles) if profile.duration_ms >= min_ms][:limit]
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        with self._lock:
+            for profile in self._recent:
+                if profile.id == profile_id:
+                    return profile
+        return None
+
+    def _label(self, frame) -> str:
+        code = frame.f_code
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{frame.f_globals.get('__name__', '?')}:{code.co_qualname}"
+            self._labels[code] = label
+        return label
+
+    def _fold(self, frame, thread_label: str) -> str:
+        labels = []
+        while frame is not None and len(labels) < MAX_STACK_DEPTH:
+            labels.append(self._label(frame))
+            frame = frame.f_back
+        labels.append(thread_label)
+        labels.reverse()
+        return ";".join(labels)
+
+    def _run(self):
+        while True:
+            self._has_work.wait()
+            if self._stopped:
+                return
+            with self._lock:
+                threads = list(self._threads.items())
+                if not threads:
+                    self._has_work.clear()
+                    continue
+            frames = sys._current_frames()
+            samples = [(profile, self._fold(frames[ident], label)) for ident, (profile, label) in threads if ident in frames]
+            del frames
+            with self._lock:
+                # finish() de lock altında; biten profilin örnekleri okunurken değişmez
+                for profile, stack in samples:
+                    if not profile.finished:
+                        profile.add_sample(stack)
+            time.sleep(self.interval)
+
+    def stop(self):
+        self._stopped = True
+        self._has_work.set()
+
+
+# Örnekleyici thread içerdiği için fork sonrası her worker kendi profiler'ını oluşturur
+profiler_provider = providers.register("profiler", Profiler, close=lambda profiler: profiler.stop())
+
+
+def get_profiler() -> Profiler:
+    return profiler_provider.get()
+
+
+def run_in_profile(fn: Callable, *args):
+    """
+    Executor görevini, context'teki profil varsa o profile bağlı olarak çalıştırır
+    (submit_in_context tarafından kopyalanan context içinde çağrılır)
+    """
+    profile = _current_profile.get()
+    if profile is None or profile.finished:
+        return fn(*args)
+    profiler = get_profiler()
+    previous = profiler.attach(profile)
+    try:
+        return fn(*args)
+    finally:
+        profiler.detach(profile, previous)
+
+
+@contextmanager
+def profile_span(kind: str, name: str):
+    """Aktif profil varsa bloğun süresini span olarak ekler"""
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    status = None
+    try:
+        yield
+    except Exception as e:
+        status = type(e).__name__
+        raise
+    finally:
+        profile.add_span(kind, name, start, time.perf_counter() - start, status)
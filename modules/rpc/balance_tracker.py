@@ -0,0 +1,156 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from modules.metrics.service import BALANCE_REFRESHES
+from modules.rpc.jsonrpc import batch_call
+
+# keccak256("Transfer(address,address,uint256)")
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+
+
+def address_topic(address: str) -> str:
+    return "0x" + address.lower()[2:].rjust(64, "0")
+
+
+class TrackedWallet:
+    """Bir (chain, adres) için son işlenen blok ve o bloktaki ERC-20 bakiyeleri"""
+    __slots__ = ("block_number", "block_hash", "token_balances", "synced_at", "lock")
+
+    def __init__(self):
+        self.block_number: Optional[int] = None
+        self.block_hash: Optional[str] = None
+        self.token_balances: Dict[str, int] = {}
+        self.synced_at = 0.0
+        self.lock = threading.Lock()
+
+
+class BalanceTracker:
+    """
+    ERC-20 bakiyelerini her seferinde alchemy_getTokenBalances ile baştan çekmek yerine
+    son işlenen bloktan sonraki Transfer loglarını (eth_getLogs) delta olarak uygular.
+
+    Tam senkronizasyon (alchemy_getTokenBalances) sadece şu durumlarda yapılır:
+    - cüzdan ilk kez görülüyorsa,
+    - son işlenen bloğun hash'i değişmişse (reorg),
+    - aradaki blok sayısı MAX_BLOCK_GAP'i aşıyorsa,
+    - bir bakiye negatife düşerse (eksik log) veya
+    - FULL_RESYNC_INTERVAL geçmişse (rebase eden / fee-on-transfer token'ların sapmasını düzeltmek için).
+    Native bakiye Transfer logu üretmediği için her seferinde eth_getBalance ile alınır.
+    """
+
+    def __init__(self, max_block_gap: int = None, full_resync_interval: float = None, max_wallets: int = None):
+        self.max_block_gap = max_block_gap or int(os.getenv("BALANCE_MAX_BLOCK_GAP", 2000))
+        self.full_resync_interval = full_resync_interval or float(os.getenv("BALANCE_FULL_RESYNC_INTERVAL", 900))
+        self.max_wallets = max_wallets or int(os.getenv("BALANCE_TRACKER_SIZE", 10000))
+        self._wallets: "OrderedDict[Tuple[int, str], TrackedWallet]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _wallet(self, chain: int, address: str) -> TrackedWallet:
+        key = (chain, address.lower())
+        with self._lock:
+            wallet = self._wallets.get(key)
+            if wallet is None:
+                wallet = TrackedWallet()
+                self._wallets[key] = wallet
+            self._wallets.move_to_end(key)
+            while len(self._wallets) > self.max_wallets:
+                self._wallets.popitem(last=False)
+            return wallet
+
+    def refresh(self, chain: int, address: str, url: str, timeout: float = None) -> Tuple[int, Dict[str, int]]:
+        """(native ham bakiye, sözleşme -> ham bakiye) döndürür"""
+        wallet = self._wallet(chain, address)
+        with wallet.lock:
+            if wallet.block_number is None or time.monotonic() - wallet.synced_at > self.full_resync_interval:
+                return self._full_sync(chain, wallet, address, url, timeout, "initial" if wallet.block_number is None else "periodic")
+
+            native_hex, head, last_block = batch_call(url, [
+                ("eth_getBalance", [address, "latest"]),
+                ("eth_getBlockByNumber", ["latest", False]),
+                ("eth_getBlockByNumber", [hex(wallet.block_number), False]),
+            ], timeout=timeout)
+
+            if not last_block or last_block.get("hash") != wallet.block_hash:
+                return self._full_sync(chain, wallet, address, url, timeout, "reorg")
+            head_number = int(head["number"], 16)
+            if head_number - wallet.block_number > self.max_block_gap:
+                return self._full_sync(chain, wallet, address, url, timeout, "gap")
+            if head_number <= wallet.block_number:
+                BALANCE_REFRESHES.inc(chain=str(chain), mode="unchanged")
+                return int(native_hex, 16), dict(wallet.token_balances)
+
+            topic = address_topic(address)
+            block_range = {"fromBlock": hex(wallet.block_number + 1), "toBlock": hex(head_number)}
+            outgoing, incoming = batch_call(url, [
+                ("eth_getLogs", [{**block_range, "topics": [TRANSFER_TOPIC, topic]}]),
+                ("eth_getLogs", [{**block_range, "topics": [TRANSFER_TOPIC, None, topic]}]),
+            ], timeout=timeout)
+
+            # Aynı aralıkta alınıp harcanan token'lar için gelen ve giden loglar net delta olarak uygulanır
+            deltas: Dict[str, int] = {}
+            self._add_deltas(deltas, outgoing, -1)
+            self._add_deltas(deltas, incoming, 1)
+            balances = self._apply_deltas(wallet.token_balances, deltas)
+            if balances is None:
+                return self._full_sync(chain, wallet, address, url, timeout, "inconsistent")
+
+            wallet.token_balances = balances
+            wallet.block_number = head_number
+            wallet.block_hash = head["hash"]
+            BALANCE_REFRESHES.inc(chain=str(chain), mode="incremental")
+            return int(native_hex, 16), dict(balances)
+
+    @staticmethod
+    def _add_deltas(deltas: Dict[str, int], logs, sign: int):
+        for log in logs or []:
+            topics = log.get("topics") or []
+            # ERC-721 Transfer'ı aynı topic'i kullanır ama tokenId'yi 4. topic olarak taşır
+            if len(topics) != 3 or log.get("removed"):
+                continue
+            data = log.get("data") or "0x"
+            if data == "0x":
+                continue
+            contract = log["address"].lower()
+            deltas[contract] = deltas.get(contract, 0) + sign * int(data, 16)
+
+    @staticmethod
+    def _apply_deltas(token_balances: Dict[str, int], deltas: Dict[str, int]) -> Optional[Dict[str, int]]:
+        """Yeni bakiyeleri döndürür; net sonucu negatife düşen sözleşme varsa (eksik log) None"""
+        balances = dict(token_balances)
+        for contract, delta in deltas.items():
+            balance = balances.get(contract, 0) + delta
+            if balance < 0:
+                return None
+            if balance:
+                balances[contract] = balance
+            else:
+                balances.pop(contract, None)
+        return balances
+
+    def _full_sync(self, chain: int, wallet: TrackedWallet, address: str, url: str, timeout: float, reason: str) -> Tuple[int, Dict[str, int]]:
+        # Bakiyeler ve referans blok aynı batch'te alınır
+        native_hex, token_result, head = batch_call(url, [
+            ("eth_getBalance", [address, "latest"]),
+            ("alchemy_getTokenBalances", [address]),
+            ("eth_getBlockByNumber", ["latest", False]),
+        ], timeout=timeout)
+
+        balances = {}
+        for token in (token_result or {}).get("tokenBalances", []):
+            balance_hex = token.get("tokenBalance") or "0x0"
+            try:
+                raw_balance = int(balance_hex, 16)
+            except ValueError:
+                continue
+            if raw_balance:
+                balances[token["contractAddress"].lower()] = raw_balance
+
+        wallet.token_balances = balances
+        wallet.block_number = int(head["number"], 16)
+        wallet.block_hash = head["hash"]
+        wallet.synced_at = time.monotonic()
+        BALANCE_REFRESHES.inc(chain=str(chain), mode=f"full_{reason}")
+        return int(native_hex, 16), dict(balances)
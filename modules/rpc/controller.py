@@ -1,19 +1,55 @@
-from fastapi import APIRouter
+import os
+from typing import Optional
+from fastapi import APIRouter, Header
+from fastapi.responses import ORJSONResponse, Response
 from dotenv import load_dotenv
 from modules.rpc.dto.swapDto import SwapDto
 from modules.rpc.service import RPCService
 from modules.rpc.dto.rpcDto import rpcDTO
 from modules.rpc.dto.priceDto import PriceDto
+from modules.rpc.response_cache import etag_matches
+from modules.core.deadline import request_deadline, run_blocking
 
 load_dotenv()
 
 router = APIRouter()
 
+# get-info / portfolio gecikme bütçesi: istemci X-Request-Deadline-Ms ile kısaltabilir, üst sınırı aşamaz
+DEFAULT_DEADLINE_MS = int(os.getenv("RPC_DEFAULT_DEADLINE_MS", 10000))
+MAX_DEADLINE_MS = int(os.getenv("RPC_MAX_DEADLINE_MS", 30000))
 
 
 @router.post("/get-info")
-async def get_info(rpc: rpcDTO):
-    return RPCService.info(rpc)
+async def get_info(
+    rpc: rpcDTO,
+    if_none_match: Optional[str] = Header(default=None),
+    accept_encoding: Optional[str] = Header(default=None),
+    x_request_deadline_ms: Optional[int] = Header(default=None),
+):
+    deadline = request_deadline(x_request_deadline_ms, DEFAULT_DEADLINE_MS, MAX_DEADLINE_MS)
+    payload, pending = await run_blocking(RPCService.info_payload, rpc, deadline)
+    use_gzip = bool(accept_encoding and "gzip" in accept_encoding.lower()) and payload.compressible
+    headers = {
+        "ETag": payload.gzip_etag if use_gzip else payload.etag,
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if pending:
+        # Eksik cüzdan/token'lar arka planda tamamlanıyor; istemci kısa süre sonra tekrar sorabilir
+        headers["X-Partial-Result"] = "true"
+    # Dashboard aynı sonucu tekrar tekrar sorguladığında gövde gönderme; istemci diğer temsilin ETag'ini de gönderebilir
+    if etag_matches(if_none_match, payload.etag, payload.gzip_etag):
+        return Response(status_code=304, headers=headers)
+
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=payload.gzip_body(), media_type="application/json", headers=headers)
+    return Response(content=payload.body, media_type="application/json", headers=headers)
+
+@router.post("/portfolio")
+async def portfolio(rpc: rpcDTO, x_request_deadline_ms: Optional[int] = Header(default=None)):
+    deadline = request_deadline(x_request_deadline_ms, DEFAULT_DEADLINE_MS, MAX_DEADLINE_MS)
+    return ORJSONResponse(await run_blocking(RPCService.portfolio, rpc, deadline))
 
 @router.post("/price")
 async def price(price: PriceDto):
@@ -0,0 +1,118 @@
+from typing import Dict, Iterable, List, Optional
+
+DEFAULT_DECIMALS = 18
+
+
+class TokenRecord:
+    """
+    Alchemy'den gelen tek bir token bakiyesi.
+
+    Bakiye ham (integer, en küçük birim) tutulur; ondalık ölçekleme fiyat
+    eşleştirmesinden sonra tek bölme ile yapılır. Sözleşme adresi fetch
+    sırasında bir kez küçük harfe çevrilir ve fiyat tablosunda doğrudan anahtar olarak kullanılır.
+    """
+    __slots__ = ("symbol", "name", "contract", "raw_balance", "logo", "is_native")
+
+    def __init__(self, symbol: str, name: str, contract: Optional[str], raw_balance: int, logo: Optional[str] = None, is_native: bool = False):
+        self.symbol = symbol
+        self.name = name
+        self.contract = contract
+        self.raw_balance = raw_balance
+        self.logo = logo
+        self.is_native = is_native
+
+
+class PriceEntry:
+    """
+    Tek bir token için önceden hazırlanmış fiyat satırı: her cüzdan/token için
+    dict birleştirme ve 10 ** decimals hesaplaması yerine bir kez oluşturulur.
+    """
+    __slots__ = ("symbol", "name", "logo", "decimals", "divisor", "usd", "change_24h", "market_cap")
+
+    def __init__(self, price_data: dict):
+        symbol = price_data.get("symbol")
+        name = price_data.get("name")
+        decimals = price_data.get("decimals")
+        self.symbol = symbol if symbol and symbol != "UNKNOWN" else None
+        self.name = name if name and name != "UNKNOWN" else None
+        self.logo = price_data.get("logo") or None
+        self.decimals = decimals if decimals is not None else DEFAULT_DECIMALS
+        self.divisor = 10 ** self.decimals
+        self.usd = price_data.get("usd", 0)
+        self.change_24h = price_data.get("percent_change_24h", 0)
+        self.market_cap = price_data.get("market_cap", 0)
+
+
+class PendingLookups:
+    """
+    İstek bütçesi dolduğunda hâlâ süren sorgular: bakiyesi gelmeyen cüzdanlar ve
+    fiyatı gelmeyen token'lar (küçük harf sözleşme adresi veya büyük harf native sembol).
+    Bakiye sorgusu hata veren cüzdanlar da (adres -> hata mesajı) eksik sonuç sayılır.
+    """
+    __slots__ = ("wallets", "tokens", "failed")
+
+    def __init__(self):
+        self.wallets = set()
+        self.tokens = set()
+        self.failed = {}
+
+    def __bool__(self):
+        return bool(self.wallets or self.tokens or self.failed)
+
+    def token_key(self, record: "TokenRecord") -> str:
+        return record.symbol.upper() if record.is_native else record.contract
+
+    def has_token(self, record: "TokenRecord") -> bool:
+        return bool(self.tokens) and self.token_key(record) in self.tokens
+
+
+def build_price_table(prices: Dict[str, dict]) -> Dict[str, PriceEntry]:
+    return {key: PriceEntry(price_data) for key, price_data in prices.items() if price_data}
+
+
+def enrich_tokens(records: Iterable[TokenRecord], native_table: Dict[str, PriceEntry], contract_table: Dict[str, PriceEntry], pending: Optional[PendingLookups] = None) -> List[dict]:
+    """
+    Fiyatı bulunan token'ları yanıt formatında döndürür, bulunamayanları eler.
+    Fiyat sorgusu süre dolduğunda hâlâ devam eden token'lar fiyatsız ve complete=False olarak eklenir.
+
+    native_table büyük harf sembol, contract_table küçük harf sözleşme adresi ile anahtarlanır.
+    """
+    native_get = native_table.get
+    contract_get = contract_table.get
+    output = []
+    append = output.append
+    for record in records:
+        entry = native_get(record.symbol) if record.is_native else contract_get(record.contract)
+        if entry is None:
+            if pending is not None and pending.has_token(record):
+                append({
+                    "symbol": record.symbol,
+                    "name": record.name,
+                    "contractAddress": record.contract,
+                    "balance": None,
+                    "raw_balance": str(record.raw_balance),
+                    "logo": record.logo,
+                    "isNative": record.is_native,
+                    "price_usd": None,
+                    "price_change_24h": None,
+                    "market_cap": None,
+                    "total_value_usd": None,
+                    "complete": False,
+                })
+            continue
+        balance = record.raw_balance / entry.divisor
+        usd = entry.usd
+        append({
+            "symbol": entry.symbol or record.symbol,
+            "name": entry.name or record.name,
+            "contractAddress": record.contract,
+            "balance": balance,
+            "logo": entry.logo or record.logo,
+            "isNative": record.is_native,
+            "price_usd": usd,
+            "price_change_24h": entry.change_24h,
+            "market_cap": entry.market_cap,
+            "total_value_usd": 0 if usd is None else balance * usd,
+            "complete": True,
+        })
+    return output
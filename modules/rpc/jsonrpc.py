@@ -0,0 +1,48 @@
+from typing import Any, List, Sequence, Tuple
+
+from modules.core.deadline import upstream_timeout
+from modules.core.providers import get_http_session
+from modules.metrics.service import track_upstream
+
+
+class JsonRpcError(Exception):
+    def __init__(self, method: str, error: Any):
+        self.method = method
+        self.error = error
+        super().__init__(f"{method} hatası: {error}")
+
+
+def batch_call(url: str, calls: Sequence[Tuple[str, list]], timeout: float = None, upstream: str = "alchemy", raise_errors: bool = True) -> List[Any]:
+    """
+    Birden fazla JSON-RPC çağrısını tek HTTP isteğinde gönderir ve sonuçları
+    çağrı sırasıyla döndürür. Herhangi bir çağrı hata dönerse JsonRpcError fırlatır;
+    raise_errors=False ise hatalı çağrının sonucu yerine JsonRpcError nesnesi konur.
+    timeout verilmezse aktif isteğin kalan bütçesinden hesaplanır (bkz. upstream_timeout).
+    """
+    payload = [
+        {"jsonrpc": "2.0", "method": method, "params": params, "id": index}
+        for index, (method, params) in enumerate(calls)
+    ]
+    operation = "batch:" + "+".join(sorted({method for method, _ in calls}))
+    with track_upstream(upstream, operation) as call:
+        response = get_http_session().post(url, json=payload, timeout=timeout or upstream_timeout())
+        call.status = response.status_code
+    response.raise_for_status()
+    body = response.json()
+    if not isinstance(body, list):
+        # Bazı sağlayıcılar batch hatasını tek bir nesne olarak döndürür
+        raise JsonRpcError("batch", body.get("error", body) if isinstance(body, dict) else body)
+
+    # Yanıtlar sırasız gelebilir, id ile eşleştir
+    by_id = {item.get("id"): item for item in body}
+    results = []
+    for index, (method, _) in enumerate(calls):
+        item = by_id.get(index)
+        if item is None or item.get("error") is not None:
+            error = JsonRpcError(method, "yanıt yok" if item is None else item["error"])
+            if raise_errors:
+                raise error
+            results.append(error)
+            continue
+        results.append(item.get("result"))
+    return results
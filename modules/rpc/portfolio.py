@@ -0,0 +1,126 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+from modules.rpc.enrichment import PriceEntry, TokenRecord
+
+NATIVE_KEY_PREFIX = "native:"
+
+
+def format_units(raw: int, decimals: int) -> str:
+    """Ham bakiyeyi yuvarlama olmadan ondalık string'e çevirir (Decimal hassasiyet sınırı olmadan)"""
+    if decimals <= 0:
+        return str(raw)
+    sign = "-" if raw < 0 else ""
+    whole, fraction = divmod(abs(raw), 10 ** decimals)
+    fraction_str = str(fraction).rjust(decimals, "0").rstrip("0")
+    return f"{sign}{whole}.{fraction_str}" if fraction_str else f"{sign}{whole}"
+
+
+def wallet_holdings(records: Iterable[TokenRecord], native_table: Dict[str, PriceEntry], contract_table: Dict[str, PriceEntry]) -> Tuple[Dict[str, int], Dict[str, dict]]:
+    """
+    Cüzdanın fiyatı bulunan token'larını döndürür:
+    (token anahtarı -> ham bakiye, token anahtarı -> güncel metadata/fiyat)
+    """
+    holdings = {}
+    token_info = {}
+    for record in records:
+        if record.is_native:
+            entry = native_table.get(record.symbol)
+            key = f"{NATIVE_KEY_PREFIX}{record.symbol}"
+        else:
+            entry = contract_table.get(record.contract)
+            key = record.contract
+        if entry is None:
+            continue
+        holdings[key] = record.raw_balance
+        if key not in token_info:
+            token_info[key] = {
+                "symbol": entry.symbol or record.symbol,
+                "name": entry.name or record.name,
+                "contractAddress": record.contract,
+                "logo": entry.logo or record.logo,
+                "isNative": record.is_native,
+                "decimals": entry.decimals,
+                "price_usd": entry.usd,
+            }
+    return holdings, token_info
+
+
+def summarize(addresses: List[str], snapshots: Dict[str, Tuple[Dict[str, int], Dict[str, dict]]], stale_wallets: Iterable[str] = ()) -> List[dict]:
+    """
+    Cüzdan snapshot'larından (adres -> (holdings, token_info)) token başına toplam ham
+    bakiye ve cüzdan dağılımını hesaplar. Bakiyeler integer toplandığı için toplamlar kesindir.
+    Token metadata/fiyatı için eski (stale) snapshot'lar yerine güncel olanlar tercih edilir.
+    """
+    stale_wallets = set(stale_wallets)
+    totals: Dict[str, int] = {}
+    breakdown: Dict[str, Dict[str, int]] = {}
+    info_by_key: Dict[str, dict] = {}
+    for address in addresses:
+        snapshot = snapshots.get(address)
+        if snapshot is None:
+            continue
+        holdings, token_info = snapshot
+        for key, raw in holdings.items():
+            totals[key] = totals.get(key, 0) + raw
+            breakdown.setdefault(key, {})[address] = raw
+            if address in stale_wallets:
+                info_by_key.setdefault(key, token_info[key])
+            else:
+                info_by_key[key] = token_info[key]
+
+    tokens = []
+    for key, total in totals.items():
+        info = info_by_key[key]
+        decimals = info["decimals"]
+        divisor = 10 ** decimals
+        price = info["price_usd"] or 0
+        wallets = breakdown[key]
+        tokens.append({
+            **info,
+            "balance": format_units(total, decimals),
+            "raw_balance": str(total),
+            "total_value_usd": total / divisor * price,
+            "wallets": [
+                {
+                    "address": address,
+                    "balance": format_units(raw, decimals),
+                    "raw_balance": str(raw),
+                    "total_value_usd": raw / divisor * price,
+                }
+                for address, raw in wallets.items()
+            ],
+        })
+    tokens.sort(key=lambda token: token["total_value_usd"], reverse=True)
+    return tokens
+
+
+class WalletSnapshotStore:
+    """
+    (chain, cüzdan) başına son başarıyla hesaplanan holdings/token_info'yu tutan LRU.
+    Bakiyesi veya bir token fiyatı alınamayan cüzdan için, hangi adres kümesiyle
+    sorulursa sorulsun, bu son snapshot kullanılır.
+    """
+
+    def __init__(self, max_entries: int = None):
+        self.max_entries = max_entries or int(os.getenv("PORTFOLIO_CACHE_SIZE", 10000))
+        self._snapshots: "OrderedDict[Hashable, Tuple[Dict[str, int], Dict[str, dict]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chain: int, address: str) -> Optional[Tuple[Dict[str, int], Dict[str, dict]]]:
+        key = (chain, address.lower())
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            if snapshot is not None:
+                self._snapshots.move_to_end(key)
+            return snapshot
+
+    def put(self, chain: int, address: str, snapshot: Tuple[Dict[str, int], Dict[str, dict]]):
+        key = (chain, address.lower())
+        with self._lock:
+            self._snapshots[key] = snapshot
+            self._snapshots.move_to_end(key)
+            while len(self._snapshots) > self.max_entries:
+                self._snapshots.popitem(last=False)
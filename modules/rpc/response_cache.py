@@ -0,0 +1,109 @@
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional
+
+import orjson
+
+from modules.rpc.enrichment import PendingLookups, TokenRecord
+
+# Bu boyutun altındaki gövdeler sıkıştırılmaz
+GZIP_MIN_SIZE = int(os.getenv("GZIP_MIN_SIZE", 1024))
+
+
+def fingerprint(chain: int, addresses: List[str], records_by_address: Dict[str, List[TokenRecord]], native_prices: dict, contract_prices: dict, pending: Optional[PendingLookups] = None) -> str:
+    """
+    Yanıtı belirleyen girdilerden (fiyatı bulunan token'ların ham bakiyeleri ve fiyatları)
+    güçlü ETag üretir. Fiyatsız token'lar yanıta girmediği için hesaba katılmaz; böylece
+    spam filtresi yeni sözleşme öğrendiğinde ETag değişmez. Python'un hash()'i süreçten
+    sürece değiştiği için blake2b kullanılır; farklı worker'lar aynı girdi için aynı ETag'i döndürür.
+    Süre dolduğunda eksik kalan ya da hata veren cüzdan/token'lar da yanıtta yer aldığı için hesaba katılır.
+    """
+    native_symbols = {symbol.upper() for symbol in native_prices}
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{chain}|".encode())
+    for address in addresses:
+        records = records_by_address.get(address)
+        if records is None:
+            digest.update(f"{address}:missing|".encode())
+            continue
+        digest.update(address.encode())
+        digest.update(repr([
+            (record.contract, record.symbol, record.raw_balance)
+            for record in records
+            if (record.symbol in native_symbols if record.is_native else record.contract in contract_prices)
+        ]).encode())
+    digest.update(orjson.dumps(native_prices, option=orjson.OPT_SORT_KEYS))
+    digest.update(orjson.dumps(contract_prices, option=orjson.OPT_SORT_KEYS))
+    if pending:
+        digest.update(repr((sorted(pending.wallets), sorted(pending.tokens), sorted(pending.failed.items()))).encode())
+    return f'"{digest.hexdigest()}"'
+
+
+class CachedPayload:
+    """Serileştirilmiş yanıt; gzip'li hali ilk ihtiyaçta bir kez üretilir"""
+    __slots__ = ("etag", "body", "_gzip_body", "_lock")
+
+    def __init__(self, etag: str, body: bytes):
+        self.etag = etag
+        self.body = body
+        self._gzip_body: Optional[bytes] = None
+        self._lock = threading.Lock()
+
+    @property
+    def compressible(self) -> bool:
+        return len(self.body) >= GZIP_MIN_SIZE
+
+    @property
+    def gzip_etag(self) -> str:
+        # Sıkıştırılmış gövde farklı bir temsil olduğu için güçlü ETag'i de farklıdır (RFC 9110 §8.8.3)
+        return f'{self.etag[:-1]}-gzip"'
+
+    def gzip_body(self) -> Optional[bytes]:
+        if not self.compressible:
+            return None
+        if self._gzip_body is None:
+            with self._lock:
+                if self._gzip_body is None:
+                    self._gzip_body = gzip.compress(self.body, compresslevel=6)
+        return self._gzip_body
+
+
+class PayloadCache:
+    """İstek anahtarı (chain + adresler) başına son yanıtı tutan LRU cache"""
+
+    def __init__(self, max_entries: int = None):
+        self.max_entries = max_entries or int(os.getenv("PAYLOAD_CACHE_SIZE", 1024))
+        self._entries: "OrderedDict[Hashable, CachedPayload]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, etag: str) -> Optional[CachedPayload]:
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is None or payload.etag != etag:
+                return None
+            self._entries.move_to_end(key)
+            return payload
+
+    def put(self, key: Hashable, payload: CachedPayload):
+        with self._lock:
+            self._entries[key] = payload
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def etag_matches(if_none_match: Optional[str], *etags: str) -> bool:
+    """If-None-Match verilen ETag'lerden (ör. düz ve gzip'li temsil) herhangi birini içeriyor mu"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {candidate.strip() for candidate in if_none_match.split(",")}
+    # W/ önekli istemci değerleri zayıf karşılaştırma ile kabul edilir (RFC 9110 §13.1.2)
+    return any(etag in candidates or f"W/{etag}" in candidates for etag in etags)
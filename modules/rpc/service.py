@@ -1,27 +1,38 @@
 from datetime import datetime
 from dotenv import load_dotenv
-import requests
 import time
 import json
 import os
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+import orjson
+from concurrent.futures import ThreadPoolExecutor, wait, TimeoutError as FutureTimeoutError
+from typing import Optional, Tuple
 from modules.rpc.dto.rpcDto import rpcDTO
 from modules.rpc.dto.swapDto import SwapDto 
 from modules.rpc.dto.priceDto import PriceDto
+from modules.metrics.service import registry, track_upstream, PRICE_LOOKUPS, TOKEN_CACHE_ENTRIES, SPAM_CONTRACTS_FILTERED, PARTIAL_RESULTS
+from modules.core.providers import providers, require_env, get_executor, get_http_session
+from modules.core.deadline import Deadline, InflightTasks, deadline_scope, upstream_timeout
+from modules.rpc.enrichment import PendingLookups, TokenRecord, build_price_table, enrich_tokens
+from modules.rpc.spam_filter import SpamFilter
+from modules.rpc.response_cache import CachedPayload, PayloadCache, fingerprint
+from modules.rpc.portfolio import WalletSnapshotStore, summarize, wallet_holdings
+from modules.rpc.balance_tracker import BalanceTracker
+from modules.tokenlist.service import get_token_index
+from modules.profiling.service import profile_span
 
 load_dotenv()
-# RPC ve API anahtarlarını .env dosyasından al
-RPC_KEY = os.getenv("RPC_KEY")
-if not RPC_KEY:
-    raise ValueError("RPC_KEY environment variable is not set. Please set it in the .env file.")
-
-COINGECKO_API_KEY = os.getenv("COINGECKO_API_KEY")
-if not COINGECKO_API_KEY:
-    raise ValueError("COINGECKO_API_KEY environment variable is not set. Please set it in the .env file.")
+# RPC ve API anahtarları .env dosyasından ilk kullanımda okunur (require_env);
+# eksik bir anahtar uygulamanın açılmasını değil sadece ilgili upstream'i etkiler
+REQUIRED_ENV = {
+    "alchemy": "RPC_KEY",
+    "coingecko": "COINGECKO_API_KEY",
+}
 
-SWAP_API_KEY = os.getenv("SWAP_API_KEY")
-if not SWAP_API_KEY:
-    raise ValueError("SWAP_API_KEY environment variable is not set. Please set it in the .env file.")
+# Upstream adresleri - benchmark/test ortamında yerel sahte sunuculara yönlendirmek için override edilebilir
+ALCHEMY_URL_TEMPLATE = os.getenv("ALCHEMY_URL_TEMPLATE", "https://{chain_name}.g.alchemy.com/v2/{api_key}")
+COINGECKO_API_URL = os.getenv("COINGECKO_API_URL", "https://api.coingecko.com/api/v3")
+GLUEX_API_URL = os.getenv("GLUEX_API_URL", "https://router.gluex.xyz/v1")
 
 NATIVE_TOKEN_MAPPING = {
     "ethereum": "ETH",
@@ -50,11 +61,54 @@ COINGECKO_NATIVE_IDS = {
     "AVAX": "avalanche-2"
 }
 
+# Bilinen token'ların fiyatları tek /simple/token_price isteğinde bu kadar sözleşme ile alınır
+COINGECKO_TOKEN_PRICE_BATCH = int(os.getenv("COINGECKO_TOKEN_PRICE_BATCH", 50))
+
+# TransactionData.chain / kullanıcı girdisi -> chain ID
+CHAIN_IDS = {
+    "ethereum": 1,
+    "sepolia": 11155111,
+    "polygon": 137,
+    "arbitrum": 42161,
+    "bsc": 56,
+    "bsctestnet": 97
+}
+
+# Chain ID -> Alchemy ağ adı ve native token sembolü
+ALCHEMY_NETWORKS = {
+    1: "eth-mainnet",
+    11155111: "eth-sepolia",
+    137: "polygon-mainnet",
+    42161: "arb-mainnet",
+    56: "bnb-mainnet",
+    97: "bnb-testnet"
+}
+
+NATIVE_SYMBOLS = {
+    1: "ETH",
+    11155111: "ETH",
+    137: "MATIC",
+    42161: "ETH",
+    56: "BNB",
+    97: "BNB"
+}
+
+
+def alchemy_url(chain):
+    chain_name = ALCHEMY_NETWORKS.get(chain)
+    if not chain_name:
+        raise ValueError(f"Bilinmeyen chain: {chain}")
+    return ALCHEMY_URL_TEMPLATE.format(chain_name=chain_name, api_key=require_env("RPC_KEY"))
+
 class SimpleTokenCache:
     def __init__(self):
         self.cache_file = "token_cache.json"
         self.cache = self.load_cache()
         self.cache_loaded = False
+        # Fiyat sorguları paralel çalıştığı için dosyaya yazma tek seferde bir thread
+        self._save_lock = threading.Lock()
+        # save=False ile yapılan ve henüz diske yazılmamış değişiklik var mı
+        self._dirty = False
     
     def load_cache(self):
         if os.path.exists(self.cache_file):
@@ -91,11 +145,28 @@ class SimpleTokenCache:
     
     def save_cache(self):
         try:
-            with open(self.cache_file, 'w') as f:
-                json.dump(self.cache, f, indent=2)
+            with self._save_lock, profile_span("disk", "token_cache:save"):
+                self._dirty = False
+                # orjson tek çağrıda serileştirir; başka thread'in eklediği kayıt yarım dosya üretmez
+                data = orjson.dumps(self.cache, option=orjson.OPT_INDENT_2)
+                temp_file = f"{self.cache_file}.{os.getpid()}.tmp"
+                with open(temp_file, 'wb') as f:
+                    f.write(data)
+                os.replace(temp_file, self.cache_file)
         except Exception as e:
             print(f"Cache kaydetme hatası: {e}")
     
+    def flush(self):
+        """save=False ile biriken değişiklikleri tek seferde yazar"""
+        if self._dirty:
+            self.save_cache()
+
+    def _changed(self, save):
+        if save:
+            self.save_cache()
+        else:
+            self._dirty = True
+
     def get_cached_price_by_symbol(self, symbol):
         cached_data = self.cache['tokens'].get(symbol.lower())
         return cached_data
@@ -110,29 +181,38 @@ class SimpleTokenCache:
     def is_token_invalid_trust(self, contract_address):
         return contract_address.lower() in self.cache['invalid_trust']
     
-    def set_cached_price_by_symbol(self, symbol, price_info):
+    def set_cached_price_by_symbol(self, symbol, price_info, save=True):
         self.cache['tokens'][symbol.lower()] = price_info
-        self.save_cache()
+        self._changed(save)
     
-    def set_cached_price_by_contract(self, contract_address, price_info):
+    def set_cached_price_by_contract(self, contract_address, price_info, save=True):
         self.cache['tokens'][f"contract_{contract_address.lower()}"] = price_info
-        self.save_cache()
+        self._changed(save)
+
+    def set_cached_prices_by_contract(self, prices_by_contract, save=True):
+        """Toplu fiyat yazımı; dosya token başına değil bir kez kaydedilir"""
+        if not prices_by_contract:
+            return
+        tokens = self.cache['tokens']
+        for contract_address, price_info in prices_by_contract.items():
+            tokens[f"contract_{contract_address.lower()}"] = price_info
+        self._changed(save)
     
-    def mark_token_not_found(self, contract_address, token_symbol=""):
+    def mark_token_not_found(self, contract_address, token_symbol="", save=True):
         self.cache['not_found'][contract_address.lower()] = {
             'timestamp': datetime.now().isoformat(),
             'symbol': token_symbol
         }
-        self.save_cache()
+        self._changed(save)
         print(f"🚫 Cache'e eklendi (bulunamadı): {token_symbol} ({contract_address})")
     
-    def mark_token_invalid_trust(self, contract_address, token_symbol="", trust_info=""):
+    def mark_token_invalid_trust(self, contract_address, token_symbol="", trust_info="", save=True):
         self.cache['invalid_trust'][contract_address.lower()] = {
             'timestamp': datetime.now().isoformat(),
             'symbol': token_symbol,
             'trust_info': trust_info
         }
-        self.save_cache()
+        self._changed(save)
     
     def cleanup_old_cache(self):
         today = datetime.now().strftime('%Y-%m-%d')
@@ -153,17 +233,72 @@ class SimpleTokenCache:
             'date': self.cache['date']
         }
 
-price_cache = SimpleTokenCache()
+# Saf veri olduğu için fork ile paylaşılabilir (gunicorn --preload)
+price_cache_provider = providers.register("price_cache", SimpleTokenCache, close=lambda cache: cache.flush(), fork_safe=True)
+
+def get_price_cache() -> SimpleTokenCache:
+    return price_cache_provider.get()
+
+# Günlük cache sıfırlamasından etkilenmeyen kalıcı spam sözleşme listesi
+spam_filter_provider = providers.register("spam_filter", SpamFilter, close=lambda f: f.close())
+
+def get_spam_filter() -> SpamFilter:
+    return spam_filter_provider.get()
+
+# /rpc/get-info için serileştirilmiş yanıtlar (ETag ile doğrulanır)
+payload_cache_provider = providers.register("payload_cache", PayloadCache)
+
+def get_payload_cache() -> PayloadCache:
+    return payload_cache_provider.get()
+
+# /rpc/portfolio için (chain, cüzdan) başına son başarılı snapshot
+wallet_snapshots_provider = providers.register("wallet_snapshots", WalletSnapshotStore)
+
+def get_wallet_snapshots() -> WalletSnapshotStore:
+    return wallet_snapshots_provider.get()
+
+# (chain, adres) başına son işlenen blok ve ERC-20 bakiyeleri
+balance_tracker_provider = providers.register("balance_tracker", BalanceTracker)
+
+def get_balance_tracker() -> BalanceTracker:
+    return balance_tracker_provider.get()
+
+# Süresi dolan isteklerin arka planda devam eden sorguları; aynı sorgu tekrar başlatılmaz
+inflight_tasks_provider = providers.register("inflight_tasks", InflightTasks)
+
+def get_inflight_tasks() -> InflightTasks:
+    return inflight_tasks_provider.get()
+
+# CoinGecko tekil sözleşme sorguları için küçük havuz (rate limit); ortak upstream havuzunu tıkamaz
+price_executor_provider = providers.register(
+    "price_executor",
+    lambda: ThreadPoolExecutor(max_workers=int(os.getenv("COINGECKO_CONCURRENCY", 4)), thread_name_prefix="coingecko"),
+    close=lambda e: e.shutdown(wait=False),
+)
+
+def get_price_executor() -> ThreadPoolExecutor:
+    return price_executor_provider.get()
+
+def _collect_cache_stats():
+    if not price_cache_provider.loaded:
+        return
+    stats = get_price_cache().get_cache_stats()
+    for kind in ("valid_tokens", "not_found", "invalid_trust"):
+        TOKEN_CACHE_ENTRIES.set(stats[kind], kind=kind)
+
+registry.add_collector(_collect_cache_stats)
 
 def get_coingecko_price_by_contract(platform, contract_address):
-    url = f"https://api.coingecko.com/api/v3/coins/{platform}/contract/{contract_address}"
-    headers = {
-        "accept": "application/json",
-        "x-cg-demo-api-key": COINGECKO_API_KEY
-    }
-    
+    url = f"{COINGECKO_API_URL}/coins/{platform}/contract/{contract_address}"
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        # Anahtar eksikse sadece fiyatlar boş kalır, bakiyeler yine döner
+        headers = {
+            "accept": "application/json",
+            "x-cg-demo-api-key": require_env("COINGECKO_API_KEY")
+        }
+        with track_upstream("coingecko", "coin_by_contract") as call:
+            response = get_http_session().get(url, headers=headers, timeout=upstream_timeout())
+            call.status = response.status_code
         if response.status_code == 200:
             data = response.json()
             
@@ -205,16 +340,47 @@ def get_coingecko_price_by_contract(platform, contract_address):
     
     return None, "error", "API request failed"
 
+def get_coingecko_token_prices(platform, contract_addresses):
+    """
+    Birden fazla sözleşmenin fiyatını tek istekte alır (metadata içermez).
+    Küçük harf sözleşme adresi -> fiyat alanları döndürür; hata durumunda boş dict.
+    """
+    url = f"{COINGECKO_API_URL}/simple/token_price/{platform}"
+    params = {
+        "contract_addresses": ",".join(contract_addresses),
+        "vs_currencies": "usd",
+        "include_market_cap": "true",
+        "include_24hr_change": "true"
+    }
+
+    try:
+        headers = {
+            "accept": "application/json",
+            "x-cg-demo-api-key": require_env("COINGECKO_API_KEY")
+        }
+        with track_upstream("coingecko", "token_price") as call:
+            response = get_http_session().get(url, headers=headers, params=params, timeout=upstream_timeout())
+            call.status = response.status_code
+        if response.status_code == 200:
+            return {
+                contract.lower(): {
+                    "usd": price_data.get("usd", 0),
+                    "market_cap": price_data.get("usd_market_cap", 0),
+                    "percent_change_24h": price_data.get("usd_24h_change") or 0
+                }
+                for contract, price_data in response.json().items()
+                if price_data
+            }
+    except Exception as e:
+        print(f"CoinGecko token price API hatası: {e}")
+
+    return {}
+
 def get_coingecko_price_by_ids(coin_ids):
     if not coin_ids:
         return {}
     
-    url = "https://api.coingecko.com/api/v3/simple/price"
-    headers = {
-        "accept": "application/json",
-        "x-cg-demo-api-key": COINGECKO_API_KEY
-    }
-    
+    url = f"{COINGECKO_API_URL}/simple/price"
     params = {
         "ids": ",".join(coin_ids),
         "vs_currencies": "usd",
@@ -223,7 +389,13 @@ def get_coingecko_price_by_ids(coin_ids):
     }
     
     try:
-        response = requests.get(url, headers=headers, params=params, timeout=10)
+        headers = {
+            "accept": "application/json",
+            "x-cg-demo-api-key": require_env("COINGECKO_API_KEY")
+        }
+        with track_upstream("coingecko", "simple_price") as call:
+            response = get_http_session().get(url, headers=headers, params=params, timeout=upstream_timeout())
+            call.status = response.status_code
         if response.status_code == 200:
             data = response.json()
             results = {}
@@ -242,97 +414,166 @@ def get_coingecko_price_by_ids(coin_ids):
     return {}
 
 class RPCService:
-    def info(rpc_request: rpcDTO):
-        wallet_results = []
+    def info(rpc_request: rpcDTO, deadline: Optional[Deadline] = None):
+        records_by_address, native_prices, contract_prices, pending = RPCService.collect(rpc_request, deadline)
+        return RPCService.render(rpc_request, records_by_address, native_prices, contract_prices, pending)
+
+    def info_payload(rpc_request: rpcDTO, deadline: Optional[Deadline] = None) -> Tuple[CachedPayload, PendingLookups]:
+        """
+        info() ile aynı yanıtı serileştirilmiş olarak döndürür. Bakiyeler ve fiyatlar
+        değişmediyse zenginleştirme ve serileştirme atlanıp önceki byte'lar kullanılır.
+        Süre dolduğu ya da bir cüzdanın bakiye sorgusu hata verdiği için eksik kalan yanıtlar cache'lenmez.
+        """
+        records_by_address, native_prices, contract_prices, pending = RPCService.collect(rpc_request, deadline)
+        etag = fingerprint(rpc_request.chain, rpc_request.addresses, records_by_address, native_prices, contract_prices, pending)
+        cache_key = (rpc_request.chain, tuple(rpc_request.addresses))
+
+        payload_cache = get_payload_cache()
+        if not pending:
+            cached = payload_cache.get(cache_key, etag)
+            if cached is not None:
+                return cached, pending
+
+        wallet_results = RPCService.render(rpc_request, records_by_address, native_prices, contract_prices, pending)
+        payload = CachedPayload(etag, orjson.dumps(wallet_results))
+        if pending:
+            PARTIAL_RESULTS.inc(len(pending.wallets), endpoint="get-info", kind="wallet")
+            PARTIAL_RESULTS.inc(len(pending.tokens), endpoint="get-info", kind="token")
+            PARTIAL_RESULTS.inc(len(pending.failed), endpoint="get-info", kind="wallet_error")
+        else:
+            payload_cache.put(cache_key, payload)
+        return payload, pending
+
+    def collect(rpc_request: rpcDTO, deadline: Optional[Deadline] = None):
+        """
+        Cüzdan bakiyelerini ve ihtiyaç duyulan fiyatları toplar:
+        (adres -> TokenRecord listesi, native fiyatlar, sözleşme fiyatları, süren sorgular)
+
+        deadline verilirse en fazla o kadar beklenir; yetişmeyen sorgular arka planda
+        tamamlanıp cache'i doldurur ve sonraki istekler aynı sorguyu tekrar başlatmaz.
+        """
+        with deadline_scope(deadline):
+            return RPCService._collect(rpc_request, deadline)
+
+    def _collect(rpc_request: rpcDTO, deadline: Optional[Deadline]):
+        records_by_address = {}
         unique_tokens_by_contract = {}
         all_token_symbols = set()
-        
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            address_to_future = {
-                executor.submit(RPCService.fetch_address_tokens, rpc_request.chain, wallet_address): wallet_address 
-                for wallet_address in rpc_request.addresses
-            }
-            
-            for completed_future in as_completed(address_to_future):
-                current_address = address_to_future[completed_future]
-                
-                try:
-                    token_list = completed_future.result()
-                    
-                    wallet_results.append({
-                        "address": current_address, 
-                        "tokens": token_list
-                    })
+        pending = PendingLookups()
+
+        executor = get_executor()
+        inflight = get_inflight_tasks()
+        address_futures = [
+            (wallet_address, inflight.submit(executor, ("wallet", rpc_request.chain, wallet_address.lower()),
+                                             RPCService.fetch_address_tokens, rpc_request.chain, wallet_address))
+            for wallet_address in rpc_request.addresses
+        ]
+        done, _ = wait([future for _, future in address_futures], timeout=deadline.remaining() if deadline else None)
+
+        for current_address, completed_future in address_futures:
+            if completed_future not in done:
+                pending.wallets.add(current_address)
+                continue
+
+            try:
+                records = completed_future.result()
+                records_by_address[current_address] = records
                     
-                    for token_info in token_list:
-                        token_symbol = token_info.get("symbol")
-                        if token_symbol:
-                            all_token_symbols.add(token_symbol)
-                        contract_address = token_info.get("contractAddress")
-                        if contract_address is not None:
-                            normalized_address = contract_address.lower()
-                            unique_tokens_by_contract[normalized_address] = token_info
+                for record in records:
+                    if record.is_native:
+                        all_token_symbols.add(record.symbol)
+                    elif record.contract is not None:
+                        unique_tokens_by_contract[record.contract] = record
                             
+            except Exception as error:
+                # Hata mesajı API anahtarlı RPC URL'ini içerebilir; istemciye genel mesaj döner
+                print(f"❌ Hata - Cüzdan adresi {current_address}: {error}")
+                pending.failed[current_address] = "Balance lookup failed"
+
+        native_prices = {}
+        contract_prices = {}
+        if unique_tokens_by_contract or all_token_symbols:
+            native_future = None
+            if all_token_symbols:
+                native_future = inflight.submit(executor, ("native", frozenset(all_token_symbols)),
+                                                RPCService.get_native_token_prices, all_token_symbols)
+            contract_prices = RPCService.get_token_prices_from_coingecko(
+                rpc_request.chain, unique_tokens_by_contract, deadline, pending
+            )
+            if native_future is not None:
+                try:
+                    native_prices = native_future.result(timeout=deadline.remaining() if deadline else None)
+                except FutureTimeoutError:
+                    pending.tokens.update(symbol.upper() for symbol in all_token_symbols)
                 except Exception as error:
-                    print(f"❌ Hata - Cüzdan adresi {current_address}: {error}")
-
-            if unique_tokens_by_contract or all_token_symbols:
-                native_prices = RPCService.get_native_token_prices(all_token_symbols)
-                contract_prices, valid_contract_tokens = RPCService.get_token_prices_from_coingecko(
-                    rpc_request.chain, unique_tokens_by_contract
-                )
-                all_prices = {**native_prices, **contract_prices}
-                all_valid_tokens = set(native_prices.keys()) | valid_contract_tokens
-                
-                for wallet_result in wallet_results:
-                    filtered_tokens = []
-                    for token in wallet_result["tokens"]:
-                        token_symbol = token.get("symbol", "").lower()
-                        contract_address = token.get("contractAddress")
-                        
-                        price_data = None
-                        is_valid_token = False
-                        
-                        if token.get("isNative", False) and token_symbol in all_valid_tokens:
-                            price_data = all_prices.get(token_symbol, {})
-                            is_valid_token = True
-                        elif contract_address:
-                            contract_key = f"contract_{contract_address.lower()}"
-                            price_data = all_prices.get(contract_key, {})
-                            if price_data:
-                                is_valid_token = True
-                        
-                        if price_data and is_valid_token:
-                            if "symbol" in price_data and price_data["symbol"] != "UNKNOWN":
-                                token["symbol"] = price_data["symbol"]
-                            if "name" in price_data and price_data["name"] != "UNKNOWN":
-                                token["name"] = price_data["name"]
-                            if "logo" in price_data and price_data["logo"]:
-                                token["logo"] = price_data["logo"]
-                            if "decimals" in price_data:
-                                old_decimals = 18
-                                new_decimals = price_data["decimals"]
-                                if new_decimals != old_decimals:
-                                    token["balance"] = token["balance"] * (10 ** old_decimals) / (10 ** new_decimals)
-                            
-                            token["price_usd"] = price_data.get("usd", 0)
-                            token["price_change_24h"] = price_data.get("percent_change_24h", 0)
-                            token["market_cap"] = price_data.get("market_cap", 0)
-                            
-                            token_balance = token.get("balance", 0)
-                            token_price = token.get("price_usd", 0)
-                            if token_price is None:
-                                token["total_value_usd"] = 0 
-                            else:
-                                token["total_value_usd"] = token_balance * token_price
-                            
-                            filtered_tokens.append(token)
-                    wallet_result["tokens"] = filtered_tokens
+                    # Fiyatlar alınamasa da bakiyeler döner
+                    print(f"❌ Hata - Native token fiyatları: {error}")
+
+        return records_by_address, native_prices, contract_prices, pending
+
+    def price_tables(native_prices, contract_prices):
+        native_table = {symbol.upper(): entry for symbol, entry in build_price_table(native_prices).items()}
+        return native_table, build_price_table(contract_prices)
+
+    def render(rpc_request: rpcDTO, records_by_address, native_prices, contract_prices, pending: Optional[PendingLookups] = None):
+        native_table, contract_table = RPCService.price_tables(native_prices, contract_prices)
+
+        # Cüzdanlar istek sırasıyla döner; aynı girdi aynı çıktıyı üretir.
+        # Bakiyesi süre içinde gelmeyen cüzdanlar boş ve complete=False olarak,
+        # bakiye sorgusu hata verenler ayrıca error ile yer alır.
+        results = []
+        for address in rpc_request.addresses:
+            if address in records_by_address:
+                tokens = enrich_tokens(records_by_address[address], native_table, contract_table, pending)
+                results.append({
+                    "address": address,
+                    "complete": all(token["complete"] for token in tokens),
+                    "tokens": tokens,
+                })
+            elif pending and address in pending.failed:
+                results.append({"address": address, "complete": False, "error": pending.failed[address], "tokens": []})
+            elif pending and address in pending.wallets:
+                results.append({"address": address, "complete": False, "tokens": []})
+        return results
 
-            return wallet_results
+    def portfolio(rpc_request: rpcDTO, deadline: Optional[Deadline] = None):
+        """
+        İstenen cüzdanlardaki token'ların toplamı (kesin bakiye, USD değeri ve cüzdan dağılımı).
+        Bakiyeler BalanceTracker ile artımlı güncellendiği için toplamlar her istekte baştan toplanır.
+        """
+        # Aynı cüzdan farklı büyük/küçük harfle tekrar gönderilirse bir kez sayılır
+        addresses = list(dict.fromkeys(address.lower() for address in rpc_request.addresses))
+        rpc_request = rpc_request.model_copy(update={"addresses": addresses})
+        records_by_address, native_prices, contract_prices, pending = RPCService.collect(rpc_request, deadline)
+        native_table, contract_table = RPCService.price_tables(native_prices, contract_prices)
+
+        wallet_snapshots = get_wallet_snapshots()
+        snapshots = {}
+        stale_wallets = []
+        for address in addresses:
+            records = records_by_address.get(address)
+            # Bakiyesi veya bir token fiyatı alınamayan cüzdanın varsa son snapshot'ı kullanılır
+            if records is None or any(pending.has_token(record) for record in records):
+                stale_wallets.append(address)
+                snapshot = wallet_snapshots.get(rpc_request.chain, address)
+                if snapshot is not None:
+                    snapshots[address] = snapshot
+                continue
+            snapshots[address] = wallet_holdings(records, native_table, contract_table)
+            wallet_snapshots.put(rpc_request.chain, address, snapshots[address])
+        tokens = summarize(addresses, snapshots, stale_wallets)
+
+        return {
+            "chain": rpc_request.chain,
+            "addresses": addresses,
+            "stale_wallets": stale_wallets,
+            "total_value_usd": sum(token["total_value_usd"] for token in tokens),
+            "tokens": tokens,
+        }
 
     def get_native_token_prices(symbols):
         results = {}
+        price_cache = get_price_cache()
         price_cache.cleanup_old_cache()
         native_ids_to_fetch = []
         symbol_to_id_mapping = {}
@@ -355,147 +596,163 @@ class RPCService:
                 if coin_id in coin_prices and symbol not in results:
                     price_data = coin_prices[coin_id]
                     results[symbol] = price_data
-                    price_cache.set_cached_price_by_symbol(symbol, price_data)
+                    price_cache.set_cached_price_by_symbol(symbol, price_data, save=False)
+            price_cache.flush()
         
         return results
 
-    def get_token_prices_from_coingecko(chain_id, tokens_by_contract):
+
+    def get_token_prices_from_coingecko(chain_id, tokens_by_contract, deadline: Optional[Deadline] = None, pending: Optional[PendingLookups] = None):
+        """
+        Küçük harf sözleşme adresi -> fiyat bilgisi döndürür (cache'te olmayanlar CoinGecko'dan).
+        Sorgular paralel çalışır; deadline dolduğunda bitmeyenler `pending`e eklenir ve
+        arka planda tamamlanıp cache'e yazılır.
+        """
         all_results = {}
-        valid_tokens = set()
         
         platform = COINGECKO_PLATFORM_MAPPING.get(chain_id)
         if not platform:
-            return all_results, valid_tokens
+            return all_results
 
-        api_calls_made = 0
         skipped_from_cache = 0
-        
-        for contract_address, token_info in tokens_by_contract.items():
-            token_symbol = token_info.get("symbol", "UNKNOWN")
-            
+        price_cache = get_price_cache()
+        token_index = get_token_index()
+        known_tokens = {}
+        unknown_contracts = []
+
+        for contract_address, token_record in tokens_by_contract.items():
             cached = price_cache.get_cached_price_by_contract(contract_address)
             if cached:
-                contract_key = f"contract_{contract_address}"
-                all_results[contract_key] = cached
-                valid_tokens.add(cached.get("symbol", token_symbol).lower())
+                all_results[contract_address] = cached
                 skipped_from_cache += 1
                 continue
 
-            if price_cache.is_token_not_found(contract_address):
+            if price_cache.is_token_not_found(contract_address) or price_cache.is_token_invalid_trust(contract_address):
                 skipped_from_cache += 1
                 continue
-            
-            if price_cache.is_token_invalid_trust(contract_address):
-                skipped_from_cache += 1
+
+            token_info = token_index.by_contract(chain_id, contract_address)
+            if token_info is not None:
+                known_tokens[contract_address] = token_info
+            else:
+                unknown_contracts.append((contract_address, token_record.symbol))
+
+        inflight = get_inflight_tasks()
+        futures = {}
+        # Token listesindeki sözleşmelerin metadata'sı yerelde; sadece fiyatları toplu alınır
+        known_contracts = list(known_tokens)
+        for start in range(0, len(known_contracts), COINGECKO_TOKEN_PRICE_BATCH):
+            batch = tuple(known_contracts[start:start + COINGECKO_TOKEN_PRICE_BATCH])
+            future = inflight.submit(get_executor(), ("token_price", chain_id, batch), RPCService.price_listed_tokens,
+                                     chain_id, platform, [known_tokens[contract] for contract in batch])
+            futures[future] = batch
+        # Tekil sorgular rate limit'e takılmamak için kendi küçük havuzunda sıraya girer
+        for contract_address, token_symbol in unknown_contracts:
+            future = inflight.submit(get_price_executor(), ("contract_price", chain_id, contract_address), RPCService.price_contract,
+                                     chain_id, platform, contract_address, token_symbol)
+            futures[future] = (contract_address,)
+
+        done, not_done = wait(futures, timeout=deadline.remaining() if deadline else None)
+        for future in done:
+            try:
+                all_results.update(future.result())
+            except Exception as e:
+                print(f"CoinGecko fiyat sorgusu hatası: {e}")
+        if pending is not None:
+            for future in not_done:
+                pending.tokens.update(futures[future])
+
+        # Tekil sorgular cache'i diske yazmaz; biten sorguların değişiklikleri tek seferde kaydedilir.
+        # Süre dolduktan sonra biten sorgularınki bir sonraki kayıtta yazılır.
+        get_price_cache().flush()
+        get_spam_filter().maybe_flush()
+        PRICE_LOOKUPS.inc(skipped_from_cache, chain=str(chain_id), source="skipped_from_cache")
+        return all_results
+
+    def price_listed_tokens(chain_id, platform, token_infos):
+        """Token listesindeki sözleşmelerin fiyatlarını tek istekte alır; gelmeyenler tekil sorguya düşer"""
+        prices = get_coingecko_token_prices(platform, [token_info.contract for token_info in token_infos])
+        price_cache = get_price_cache()
+        results = {}
+        fallback = []
+        for token_info in token_infos:
+            price_fields = prices.get(token_info.contract)
+            if not price_fields:
+                fallback.append(token_info)
                 continue
+            results[token_info.contract] = {**price_fields, **token_info.price_metadata()}
+        price_cache.set_cached_prices_by_contract(results, save=False)
+        PRICE_LOOKUPS.inc(len(results), chain=str(chain_id), source="token_list")
+
+        # Tekil sorgular rate limit havuzunda sıraya girer (get_token_prices_from_coingecko ile aynı anahtar)
+        inflight = get_inflight_tasks()
+        futures = [
+            inflight.submit(get_price_executor(), ("contract_price", chain_id, token_info.contract), RPCService.price_contract,
+                            chain_id, platform, token_info.contract, token_info.symbol)
+            for token_info in fallback
+        ]
+        for future in futures:
+            try:
+                results.update(future.result())
+            except Exception as e:
+                print(f"CoinGecko fiyat sorgusu hatası: {e}")
+        # Toplu fiyatlar ve tekil sorguların sonuçları tek dosya yazımıyla kaydedilir
+        price_cache.flush()
+        return results
 
-            price_data, status, info = get_coingecko_price_by_contract(platform, contract_address)
-            api_calls_made += 1
-            
-            if status == "success" and price_data:
-                contract_key = f"contract_{contract_address}"
-                all_results[contract_key] = price_data
-                valid_tokens.add(price_data.get("symbol", token_symbol).lower())
-                
-                price_cache.set_cached_price_by_contract(contract_address, price_data)
-                
-                
-            elif status == "not_found":
-                price_cache.mark_token_not_found(contract_address, token_symbol)
-                
-            elif status == "invalid_trust":
-                price_cache.mark_token_invalid_trust(contract_address, token_symbol, info)
-            
-        return all_results, valid_tokens
+    def price_contract(chain_id, platform, contract_address, token_symbol):
+        """
+        Tek sözleşmenin fiyatı ve metadata'sı; bulunamayan / güvenilmeyen sözleşmeler spam filtresine eklenir.
+        Cache diske yazılmaz, çağıran batch sonunda price_cache.flush() ile kaydeder.
+        """
+        price_data, status, info = get_coingecko_price_by_contract(platform, contract_address)
+        PRICE_LOOKUPS.inc(chain=str(chain_id), source="api_call")
+        price_cache = get_price_cache()
+
+        if status == "success" and price_data:
+            price_cache.set_cached_price_by_contract(contract_address, price_data, save=False)
+            return {contract_address: price_data}
+
+        if status == "not_found":
+            price_cache.mark_token_not_found(contract_address, token_symbol, save=False)
+            get_spam_filter().add(chain_id, contract_address)
+        elif status == "invalid_trust":
+            price_cache.mark_token_invalid_trust(contract_address, token_symbol, info, save=False)
+            get_spam_filter().add(chain_id, contract_address)
+        return {}
 
     def fetch_address_tokens(chain, address):
-        chain_name = {
-            1: "eth-mainnet",
-            11155111: "eth-sepolia",
-            137: "polygon-mainnet",
-            42161: "arb-mainnet",
-            56: "bnb-mainnet",
-            97: "bnb-testnet"
-        }.get(chain)
+        url = alchemy_url(chain)
 
-        if not chain_name:
-            raise ValueError(f"Bilinmeyen chain: {chain}")
-
-        url = f"https://{chain_name}.g.alchemy.com/v2/{RPC_KEY}"
-        headers = {'Content-Type': 'application/json'}
+        # Aktif cüzdanlarda sadece son işlenen bloktan sonraki Transfer logları çekilir
+        native_balance, token_balances = get_balance_tracker().refresh(chain, address, url)
 
         token_data = []
-
-        try:
-            native_balance_req = {
-                "jsonrpc": "2.0",
-                "method": "eth_getBalance",
-                "params": [address, "latest"],
-                "id": 10
-            }
-            native_res = requests.post(url, headers=headers, json=native_balance_req, timeout=10).json()
-            native_balance = int(native_res.get("result", "0x0"), 16) / 1e18
-
-            if native_balance > 0:
-                native_symbol = {
-                    1: "ETH",
-                    11155111: "ETH",
-                    137: "MATIC",
-                    42161: "ETH",
-                    56: "BNB",
-                    97: "BNB"
-                }.get(chain, "NATIVE")
-
-                token_data.append({
-                    "symbol": native_symbol,
-                    "name": native_symbol,
-                    "contractAddress": None,
-                    "balance": native_balance,
-                    "logo": None,
-                    "isNative": True
-                })
-        except Exception as e:
-            print(f"Native token alınırken hata: {e}")
-
-        try:
-            data = {
-                "jsonrpc": "2.0",
-                "method": "alchemy_getTokenBalances",
-                "params": [address],
-                "id": 1
-            }
-            balance_res = requests.post(url, headers=headers, json=data, timeout=10).json()
-            balances = balance_res.get("result", {}).get("tokenBalances", [])
-        except Exception as e:
-            return token_data
-
-        for token in balances:
-            try:
-                balance_hex = token.get("tokenBalance", "0x0")
-                if balance_hex == "0x0":
-                    continue
-                
-                actual_balance = int(balance_hex, 16) / (10 ** 18)
-                if actual_balance == 0:
-                    continue
-                
-                # Placeholder bilgiler - CoinGecko'dan güncellenecek
-                token_data.append({
-                    "symbol": "UNKNOWN",  # CoinGecko'dan güncellenecek
-                    "name": "UNKNOWN",    # CoinGecko'dan güncellenecek
-                    "contractAddress": token["contractAddress"],
-                    "balance": actual_balance,
-                    "logo": None,         # CoinGecko'dan güncellenecek
-                    "isNative": False
-                })
-            except Exception as e:
-                print(f"Token bakiye hatası: {e}")
+        if native_balance > 0:
+            native_symbol = NATIVE_SYMBOLS.get(chain, "NATIVE")
+            token_data.append(TokenRecord(native_symbol, native_symbol, None, native_balance, is_native=True))
+
+        token_index = get_token_index()
+        for contract_address, raw_balance in token_balances.items():
+            token_info = token_index.by_contract(chain, contract_address)
+            if token_info is not None:
+                token_data.append(TokenRecord(token_info.symbol, token_info.name, contract_address, raw_balance, logo=token_info.logo))
                 continue
+            # Placeholder bilgiler - symbol/name/logo/decimals CoinGecko'dan güncellenecek
+            token_data.append(TokenRecord("UNKNOWN", "UNKNOWN", contract_address, raw_balance))
+
+        # Bilinen spam sözleşmeleri fiyatlamaya girmeden ele
+        known_spam = get_spam_filter().filter_known(
+            chain, [record.contract for record in token_data if not record.is_native]
+        )
+        if known_spam:
+            SPAM_CONTRACTS_FILTERED.inc(len(known_spam), chain=str(chain))
+            token_data = [record for record in token_data if record.contract not in known_spam]
 
         return token_data
     
     def price(price: PriceDto):
-        url = "https://router.gluex.xyz/v1/quote"
+        url = f"{GLUEX_API_URL}/quote"
 
         payload = {
             "chainID": price.chainID,
@@ -520,7 +777,9 @@ class RPCService:
             "Referer": "https://dapp.gluex.xyz/"
         }
 
-        response = requests.post(url, json=payload, headers=headers)
+        with track_upstream("gluex", "price") as call:
+            response = get_http_session().post(url, json=payload, headers=headers)
+            call.status = response.status_code
         response_data = response.json()
         if response.status_code != 200:
             return {
@@ -562,7 +821,7 @@ class RPCService:
         return response
 
     def swap(swap: SwapDto):
-        url = "https://router.gluex.xyz/v1/quote"
+        url = f"{GLUEX_API_URL}/quote"
 
         payload = {
             "chainID": swap.chainID,
@@ -582,7 +841,9 @@ class RPCService:
             "Referer": "https://dapp.gluex.xyz/"
         }
 
-        response = requests.post(url, json=payload, headers=headers)
+        with track_upstream("gluex", "swap") as call:
+            response = get_http_session().post(url, json=payload, headers=headers)
+            call.status = response.status_code
 
         response_data = response.json()
         if response.status_code != 200:
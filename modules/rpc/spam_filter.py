@@ -0,0 +1,313 @@
+import fcntl
+import mmap
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set
+
+ADDRESS_SIZE = 20
+DAY_SIZE = 4
+# Kayıt: 20 byte adres + eklendiği gün (epoch'tan beri, big-endian)
+RECORD_SIZE = ADDRESS_SIZE + DAY_SIZE
+# Birleştirme sırasında dosyadan tek seferde kopyalanan en fazla byte (64K kayıt)
+MERGE_CHUNK_SIZE = 65536 * RECORD_SIZE
+# Bu kadar gün önce eklenen sözleşmeler tekrar fiyatlanır (listelenen / güven skoru düzelen token'lar için)
+SPAM_FILTER_TTL_DAYS = int(os.getenv("SPAM_FILTER_TTL_DAYS", 30))
+
+
+def _today() -> int:
+    return int(time.time() // 86400)
+
+
+def _record(key: bytes, day: int) -> bytes:
+    return key + day.to_bytes(DAY_SIZE, "big")
+
+
+def _record_day(data, offset: int) -> int:
+    return int.from_bytes(data[offset + ADDRESS_SIZE:offset + RECORD_SIZE], "big")
+
+
+def _unexpired(chunk: bytes, min_day: int) -> bytes:
+    return b"".join(
+        chunk[offset:offset + RECORD_SIZE]
+        for offset in range(0, len(chunk), RECORD_SIZE)
+        if _record_day(chunk, offset) >= min_day
+    )
+
+
+def _to_bytes(contract_address: str) -> Optional[bytes]:
+    try:
+        raw = bytes.fromhex(contract_address[2:] if contract_address.startswith(("0x", "0X")) else contract_address)
+    except ValueError:
+        return None
+    return raw if len(raw) == ADDRESS_SIZE else None
+
+
+def _merge_sorted(existing: Optional[mmap.mmap], pending: List[bytes], out, min_day: Optional[int] = None):
+    """
+    Sıralı dosya ile sıralı yeni kayıtları birleştirir: her yeni kaydın yeri ikili
+    aramayla bulunur, aradaki dosya bölümü MERGE_CHUNK_SIZE'lık parçalarla kopyalanır.
+    Dosyada olan adres yeni kaydın günüyle güncellenir. min_day verilirse daha eski
+    kayıtlar atılır (kopyalanan parçalar tek tek taranır, bu yüzden günde bir yapılır).
+    """
+    count = len(existing) // RECORD_SIZE if existing is not None else 0
+    position = 0
+
+    def copy_until(end: int):
+        nonlocal position
+        while position < end:
+            chunk_end = min(end, position + MERGE_CHUNK_SIZE // RECORD_SIZE)
+            chunk = existing[position * RECORD_SIZE:chunk_end * RECORD_SIZE]
+            out.write(chunk if min_day is None else _unexpired(chunk, min_day))
+            position = chunk_end
+
+    def key_at(index: int) -> bytes:
+        return existing[index * RECORD_SIZE:index * RECORD_SIZE + ADDRESS_SIZE]
+
+    previous = None
+    for record in pending:
+        key = record[:ADDRESS_SIZE]
+        if key == previous:
+            continue
+        previous = key
+        low, high = position, count
+        while low < high:
+            mid = (low + high) // 2
+            if key_at(mid) < key:
+                low = mid + 1
+            else:
+                high = mid
+        copy_until(low)
+        if position < count and key_at(position) == key:
+            position += 1
+        out.write(record)
+    copy_until(count)
+
+
+class ContractSet:
+    """
+    Tek bir chain için bilinen spam sözleşmeler.
+
+    Disk formatı sıralı, sabit genişlikli (20 byte) adres dizisidir ve mmap ile
+    okunur: milyonlarca kayıtta da bellekte sadece erişilen sayfalar tutulur,
+    üyelik testi ikili arama ile yapılır. Yeni kayıtlar önce `pending` kümesine
+    eklenir, `flush` ile sıralı dosyayla parça parça birleştirilip (dosya belleğe
+    alınmadan) atomik olarak yazılır. Birleştirme sırasında okuma kilidi tutulmaz.
+
+    Her kayıt eklendiği günü taşır; ttl_days'ten eski kayıtlar üyelik testinde
+    sayılmaz (sözleşme tekrar kontrol edilir) ve günün ilk flush'ında dosyadan silinir.
+    """
+
+    def __init__(self, path: str, ttl_days: int = SPAM_FILTER_TTL_DAYS):
+        self.path = path
+        self.ttl_days = ttl_days
+        self.pending: Dict[bytes, int] = {}
+        # Diske yazılmakta olan kayıtlar; yazım bitene kadar üyelik testinde sayılır
+        self._flushing: Dict[bytes, int] = {}
+        self._compacted_day: Optional[int] = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._mmap: Optional[mmap.mmap] = None
+        self._count = 0
+        self._file_id = None
+        self._last_reload = time.monotonic()
+        self._open()
+
+    def __len__(self):
+        return self._count + len(self.pending) + len(self._flushing)
+
+    def _open(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._mmap, self._count, self._file_id = None, 0, None
+            return
+        file_id = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if file_id == self._file_id:
+            return
+        old = self._mmap
+        if stat.st_size:
+            with open(self.path, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._mmap = None
+        self._count = stat.st_size // RECORD_SIZE
+        self._file_id = file_id
+        if old is not None:
+            old.close()
+
+    def reload(self, min_interval: float = 0):
+        """Başka bir worker dosyayı güncellediyse yeni sürümü eşler"""
+        now = time.monotonic()
+        if now - self._last_reload < min_interval:
+            return
+        self._last_reload = now
+        with self._lock:
+            self._open()
+
+    def _min_day(self) -> int:
+        return _today() - self.ttl_days + 1
+
+    def _day_on_disk(self, key: bytes) -> Optional[int]:
+        data = self._mmap
+        low, high = 0, self._count
+        while low < high:
+            mid = (low + high) // 2
+            offset = mid * RECORD_SIZE
+            value = data[offset:offset + ADDRESS_SIZE]
+            if value < key:
+                low = mid + 1
+            elif value > key:
+                high = mid
+            else:
+                return _record_day(data, offset)
+        return None
+
+    def contains(self, contract_address: str) -> bool:
+        key = _to_bytes(contract_address)
+        if key is None:
+            return False
+        min_day = self._min_day()
+        with self._lock:
+            if key in self.pending or key in self._flushing:
+                return True
+            if self._mmap is None:
+                return False
+            day = self._day_on_disk(key)
+            return day is not None and day >= min_day
+
+    def add(self, contract_address: str):
+        key = _to_bytes(contract_address)
+        if key is not None:
+            with self._lock:
+                self.pending[key] = _today()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                if not self.pending:
+                    return
+                self._flushing, self.pending = self.pending, {}
+            today = _today()
+            min_day = self._min_day() if self._compacted_day != today else None
+            try:
+                self._merge_to_disk(sorted(_record(key, day) for key, day in self._flushing.items()), min_day)
+            except Exception:
+                # Yazılamayan kayıtlar kaybolmasın, bir sonraki flush'ta tekrar denenir
+                with self._lock:
+                    self.pending = {**self._flushing, **self.pending}
+                    self._flushing = {}
+                raise
+            if min_day is not None:
+                self._compacted_day = today
+            with self._lock:
+                self._open()
+                self._flushing = {}
+
+    def _merge_to_disk(self, pending: List[bytes], min_day: Optional[int] = None):
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        # Aynı dosyaya yazan diğer worker'larla çakışmamak için dosya kilidi
+        with open(self.path + ".lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            temp_path = f"{self.path}.{os.getpid()}.tmp"
+            # Diğer worker'ın son yazdığı sürüm, okuyucuların kullandığı mmap'ten bağımsız açılır
+            try:
+                with open(self.path, "rb") as source:
+                    size = os.fstat(source.fileno()).st_size
+                    existing = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+            except FileNotFoundError:
+                existing = None
+            try:
+                with open(temp_path, "wb") as out:
+                    _merge_sorted(existing, pending, out, min_day)
+            finally:
+                if existing is not None:
+                    existing.close()
+            os.replace(temp_path, self.path)
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+
+
+class SpamFilter:
+    """
+    Chain başına kalıcı spam sözleşme kümesi.
+
+    SimpleTokenCache'in not_found / invalid_trust kayıtları günlük sıfırlanırken
+    bu küme SPAM_FILTER_TTL_DAYS boyunca kalıcıdır; bakiyeler alındıktan hemen sonra
+    bilinen spam token'lar fiyatlama adımına hiç girmeden elenir.
+    """
+
+    FLUSH_THRESHOLD = 500
+    FLUSH_INTERVAL = 60
+    RELOAD_INTERVAL = 30
+
+    def __init__(self, directory: str = None):
+        self.directory = directory or os.getenv("SPAM_FILTER_DIR", "spam_filter")
+        self._sets: Dict[int, ContractSet] = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._flush_thread: Optional[threading.Thread] = None
+
+    def _set(self, chain_id: int) -> ContractSet:
+        contract_set = self._sets.get(chain_id)
+        if contract_set is None:
+            with self._lock:
+                contract_set = self._sets.get(chain_id)
+                if contract_set is None:
+                    # Eski (günsüz, 20 byte kayıtlı) {chain_id}.bin dosyaları okunmaz
+                    contract_set = ContractSet(os.path.join(self.directory, f"{chain_id}.v2.bin"))
+                    self._sets[chain_id] = contract_set
+        return contract_set
+
+    def is_spam(self, chain_id: int, contract_address: str) -> bool:
+        return self._set(chain_id).contains(contract_address)
+
+    def add(self, chain_id: int, contract_address: str):
+        self._set(chain_id).add(contract_address)
+
+    def filter_known(self, chain_id: int, contract_addresses: Iterable[str]) -> Set[str]:
+        """Verilen adreslerden bilinen spam olanları döndürür"""
+        contract_set = self._set(chain_id)
+        contract_set.reload(self.RELOAD_INTERVAL)
+        return {address for address in contract_addresses if contract_set.contains(address)}
+
+    def maybe_flush(self):
+        """Eşik veya süre dolduysa birleştirmeyi arka planda başlatır; istek yolunda diske yazılmaz"""
+        pending = sum(len(contract_set.pending) for contract_set in list(self._sets.values()))
+        if not pending:
+            return
+        if pending < self.FLUSH_THRESHOLD and time.monotonic() - self._last_flush <= self.FLUSH_INTERVAL:
+            return
+        with self._lock:
+            if self._flush_thread is not None and self._flush_thread.is_alive():
+                return
+            self._last_flush = time.monotonic()
+            self._flush_thread = threading.Thread(target=self.flush, name="spam-filter-flush", daemon=True)
+            self._flush_thread.start()
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        for contract_set in list(self._sets.values()):
+            try:
+                contract_set.flush()
+            except Exception as e:
+                print(f"Spam filtresi kaydetme hatası ({contract_set.path}): {e}")
+
+    def close(self):
+        flush_thread = self._flush_thread
+        if flush_thread is not None:
+            flush_thread.join()
+        for contract_set in list(self._sets.values()):
+            try:
+                contract_set.close()
+            except Exception as e:
+                print(f"Spam filtresi kapatma hatası ({contract_set.path}): {e}")
+
+    def get_stats(self):
+        return {chain_id: len(contract_set) for chain_id, contract_set in self._sets.items()}
@@ -0,0 +1,45 @@
+"""
+Token indeksini ağ erişimi olmadan yeniden derler.
+
+    python -m modules.tokenlist.build --source extra.json              # ek liste (öncelikli) + paket listesi
+    python -m modules.tokenlist.build --output /srv/data/tokens.idx    # varsayılan: TOKEN_INDEX_PATH
+
+Kaynaklar Uniswap token list formatındadır (ör. indirilmiş bir CoinGecko/Uniswap listesi).
+Uygulama dosyayı TOKEN_INDEX_PATH tanımlıysa kullanır; yoksa paket listesini bellekte derler.
+Dosya atomik olarak değiştirilir; çalışan worker'lar en geç bir dakika içinde yeni indekse geçer.
+"""
+import argparse
+import os
+
+from modules.tokenlist.service import (
+    BUNDLED_TOKEN_LIST, FLAG_BUNDLED_ONLY, NO_DIGEST, TokenIndex, build_index, load_token_lists, source_digest, write_index,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Token listesinden mmap indeksi derler")
+    parser.add_argument("--source", action="append", default=[], help="Ek token list JSON dosyası (birden fazla verilebilir)")
+    parser.add_argument("--no-bundled", action="store_true", help="Paketle gelen listeyi dahil etme")
+    parser.add_argument("--output", default=os.getenv("TOKEN_INDEX_PATH"), help="Varsayılan: TOKEN_INDEX_PATH")
+    args = parser.parse_args()
+    if not args.output:
+        parser.error("--output veya TOKEN_INDEX_PATH gerekli")
+
+    sources = list(args.source)
+    if not args.no_bundled:
+        sources.append(BUNDLED_TOKEN_LIST)
+    if not sources:
+        parser.error("en az bir kaynak gerekli")
+
+    tokens = load_token_lists(sources)
+    # Paket listesinin özeti saklanır; liste güncellenince eski indeks tespit edilir
+    bundled_digest = NO_DIGEST if args.no_bundled else source_digest(BUNDLED_TOKEN_LIST)
+    flags = FLAG_BUNDLED_ONLY if not args.source else 0
+    write_index(build_index(tokens, bundled_digest, flags), args.output)
+    index = TokenIndex(args.output)
+    print(f"{len(index)} token -> {args.output} ({os.path.getsize(args.output)} byte)")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Iterable, List, Optional
+
+from modules.core.providers import providers
+
+BUNDLED_TOKEN_LIST = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tokens.json")
+
+MAGIC = b"TKIX"
+VERSION = 2
+# magic, sürüm, bayraklar, kayıt sayısı, kayıt / sembol indeksi / string tablosu offset'leri,
+# derlemeye dahil edilen paket listesinin özeti (dahil değilse sıfır)
+HEADER = struct.Struct(">4sHHIIII16s")
+# İndeks sadece paketle gelen listeden derlendi; liste değişince kendiliğinden yeniden derlenebilir
+FLAG_BUNDLED_ONLY = 1
+NO_DIGEST = bytes(16)
+# chain, sözleşme, decimals, sembol / isim / logo string offset'leri; ilk 24 byte sıralama anahtarıdır
+RECORD = struct.Struct(">I20sBxxxIII")
+# chain, büyük harf sembolün ilk 12 byte'ı, kayıt sırası
+SYMBOL_ENTRY = struct.Struct(">I12sI")
+CONTRACT_KEY_SIZE = 24
+SYMBOL_KEY_SIZE = 16
+SYMBOL_PREFIX_SIZE = 12
+
+
+class TokenInfo:
+    __slots__ = ("chain_id", "contract", "symbol", "name", "decimals", "logo")
+
+    def __init__(self, chain_id: int, contract: str, symbol: str, name: str, decimals: int, logo: Optional[str]):
+        self.chain_id = chain_id
+        self.contract = contract
+        self.symbol = symbol
+        self.name = name
+        self.decimals = decimals
+        self.logo = logo
+
+    def price_metadata(self) -> dict:
+        """get_coingecko_price_by_contract sonucundaki metadata alanları"""
+        return {"symbol": self.symbol.upper(), "name": self.name, "logo": self.logo, "decimals": self.decimals}
+
+
+def _symbol_key(chain_id: int, symbol: str) -> bytes:
+    return struct.pack(">I", chain_id) + symbol.upper().encode()[:SYMBOL_PREFIX_SIZE].ljust(SYMBOL_PREFIX_SIZE, b"\0")
+
+
+def source_digest(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).digest()[:16]
+
+
+def load_token_lists(paths: Iterable[str]) -> List[dict]:
+    """
+    Uniswap token list formatındaki dosyaları okur. Aynı (chain, sözleşme) birden fazla
+    listede varsa ilk görülen kullanılır; liste sırası aynı sembollü token'lar arasında önceliktir.
+    """
+    tokens = {}
+    for path in paths:
+        with open(path) as f:
+            document = json.load(f)
+        for token in document.get("tokens", []):
+            key = (int(token["chainId"]), token["address"].lower())
+            if key not in tokens:
+                tokens[key] = token
+    return list(tokens.values())
+
+
+def build_index(tokens: List[dict], bundled_digest: bytes = NO_DIGEST, flags: int = 0) -> bytes:
+    """Token listesini mmap ile okunacak ikili indekse çevirir"""
+    strings = bytearray(b"\0\0")  # offset 0 = boş string
+    string_offsets = {"": 0}
+
+    def add_string(value: Optional[str]) -> int:
+        value = value or ""
+        offset = string_offsets.get(value)
+        if offset is None:
+            data = value.encode()[:0xFFFF]
+            offset = len(strings)
+            strings.extend(struct.pack(">H", len(data)) + data)
+            string_offsets[value] = offset
+        return offset
+
+    entries = []
+    for priority, token in enumerate(tokens):
+        chain_id = int(token["chainId"])
+        contract = bytes.fromhex(token["address"][2:])
+        record = RECORD.pack(
+            chain_id, contract, int(token.get("decimals", 18)),
+            add_string(token.get("symbol")), add_string(token.get("name")), add_string(token.get("logoURI")),
+        )
+        entries.append((record, priority, chain_id, token.get("symbol") or ""))
+
+    entries.sort(key=lambda entry: entry[0][:CONTRACT_KEY_SIZE])
+    symbol_entries = sorted(
+        (_symbol_key(chain_id, symbol), priority, index)
+        for index, (_, priority, chain_id, symbol) in enumerate(entries)
+        if symbol
+    )
+
+    records = b"".join(entry[0] for entry in entries)
+    symbols = b"".join(SYMBOL_ENTRY.pack(*struct.unpack(">I12s", key), index) for key, _, index in symbol_entries)
+    records_offset = HEADER.size
+    symbols_offset = records_offset + len(records)
+    strings_offset = symbols_offset + len(symbols)
+    header = HEADER.pack(MAGIC, VERSION, flags, len(entries), records_offset, symbols_offset, strings_offset, bundled_digest)
+    return header + records + symbols + bytes(strings)
+
+
+def build_bundled_index() -> bytes:
+    return build_index(load_token_lists([BUNDLED_TOKEN_LIST]), source_digest(BUNDLED_TOKEN_LIST), FLAG_BUNDLED_ONLY)
+
+
+def write_index(data: bytes, path: str):
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    # Çalışan worker'lar eski dosyayı eşlemeye devam eder, reload ile yenisine geçer
+    os.replace(temp_path, path)
+
+
+class TokenIndex:
+    """
+    Chain başına sembol <-> sözleşme <-> decimals/isim/logo indeksi.
+
+    Paketle gelen token listesinden derlenen ikili dosya mmap ile okunur; kayıtlar
+    (chain, sözleşme) sırasında, sembol indeksi (chain, sembol) sırasında tutulur ve
+    her iki yönde de ikili arama yapılır.
+
+    TOKEN_INDEX_PATH tanımlı değilse paketle gelen liste açılışta bellekte derlenir
+    (diske yazılmaz, her zaman güncel listeyi kullanır). Tanımlıysa dosya
+    `python -m modules.tokenlist.build` ile ek listelerle ağ erişimi olmadan üretilebilir;
+    çalışan süreçler `reload` ile yeni dosyaya geçer. Sadece paket listesinden derlenmiş
+    bir dosya, liste değiştiyse (başlıktaki özet tutmuyorsa) açılışta yeniden derlenir.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv("TOKEN_INDEX_PATH")
+        self._lock = threading.Lock()
+        self._mmap: Optional[mmap.mmap] = None
+        self._file_id = None
+        self._last_reload = time.monotonic()
+        self._count = 0
+        self._records_offset = self._symbols_offset = self._strings_offset = 0
+        if self.path is None:
+            data = build_bundled_index()
+            memory = mmap.mmap(-1, len(data))
+            memory.write(data)
+            self._map(memory, None)
+            return
+        if self._is_stale():
+            write_index(build_bundled_index(), self.path)
+        self._open()
+
+    def __len__(self):
+        return self._count
+
+    def _is_stale(self) -> bool:
+        try:
+            with open(self.path, "rb") as f:
+                header = f.read(HEADER.size)
+        except FileNotFoundError:
+            return True
+        if len(header) < HEADER.size or header[:4] != MAGIC:
+            # Tanınmayan dosyanın üzerine yazılmaz; _open hata verir
+            return False
+        version, flags = struct.unpack_from(">HH", header, 4)
+        bundled_digest = header[-16:]
+        if version != VERSION:
+            # Eski biçimdeki dosyaları sadece otomatik derleme üretmişti
+            return True
+        if bundled_digest == NO_DIGEST or bundled_digest == source_digest(BUNDLED_TOKEN_LIST):
+            return False
+        if flags & FLAG_BUNDLED_ONLY:
+            return True
+        print(f"{self.path} eski token listesiyle derlenmiş; `python -m modules.tokenlist.build` ile yeniden derleyin")
+        return False
+
+    def _open(self):
+        stat = os.stat(self.path)
+        file_id = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if file_id == self._file_id:
+            return
+        with open(self.path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._map(data, file_id)
+
+    def _map(self, data: mmap.mmap, file_id):
+        magic, version, _, count, records_offset, symbols_offset, strings_offset, _ = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            data.close()
+            raise ValueError(f"{self.path} geçerli bir token indeksi değil")
+        old = self._mmap
+        self._mmap, self._file_id, self._count = data, file_id, count
+        self._records_offset, self._symbols_offset, self._strings_offset = records_offset, symbols_offset, strings_offset
+        if old is not None:
+            old.close()
+
+    def reload(self, min_interval: float = 0):
+        """Dosya yeniden derlendiyse yeni sürümü eşler"""
+        if self.path is None:
+            return
+        now = time.monotonic()
+        if now - self._last_reload < min_interval:
+            return
+        self._last_reload = now
+        with self._lock:
+            self._open()
+
+    def _string(self, offset: int) -> str:
+        start = self._strings_offset + offset
+        (length,) = struct.unpack_from(">H", self._mmap, start)
+        return self._mmap[start + 2:start + 2 + length].decode()
+
+    def _record(self, index: int) -> TokenInfo:
+        chain_id, contract, decimals, symbol, name, logo = RECORD.unpack_from(self._mmap, self._records_offset + index * RECORD.size)
+        return TokenInfo(chain_id, "0x" + contract.hex(), self._string(symbol), self._string(name), decimals, self._string(logo) or None)
+
+    def by_contract(self, chain_id: int, contract_address: str) -> Optional[TokenInfo]:
+        try:
+            key = struct.pack(">I", chain_id) + bytes.fromhex(contract_address[2:])
+        except (ValueError, struct.error):
+            return None
+        if len(key) != CONTRACT_KEY_SIZE:
+            return None
+        with self._lock:
+            data, base = self._mmap, self._records_offset
+            low, high = 0, self._count
+            while low < high:
+                mid = (low + high) // 2
+                offset = base + mid * RECORD.size
+                value = data[offset:offset + CONTRACT_KEY_SIZE]
+                if value < key:
+                    low = mid + 1
+                elif value > key:
+                    high = mid
+                else:
+                    return self._record(mid)
+        return None
+
+    def by_symbol(self, chain_id: int, symbol: str) -> Optional[TokenInfo]:
+        """Sembolü büyük/küçük harf duyarsız eşleştirir; aynı sembolde listedeki ilk token döner"""
+        symbol = symbol.strip().lstrip("$")
+        if not symbol:
+            return None
+        key = _symbol_key(chain_id, symbol)
+        with self._lock:
+            data, base = self._mmap, self._symbols_offset
+            count = (self._strings_offset - base) // SYMBOL_ENTRY.size
+            low, high = 0, count
+            while low < high:
+                mid = (low + high) // 2
+                offset = base + mid * SYMBOL_ENTRY.size
+                if data[offset:offset + SYMBOL_KEY_SIZE] < key:
+                    low = mid + 1
+                else:
+                    high = mid
+            # 12 byte'tan uzun sembollerde önek eşleşmesi tam sembolle doğrulanır
+            while low < count:
+                offset = base + low * SYMBOL_ENTRY.size
+                if data[offset:offset + SYMBOL_KEY_SIZE] != key:
+                    break
+                token = self._record(SYMBOL_ENTRY.unpack_from(data, offset)[2])
+                if token.symbol.upper() == symbol.upper():
+                    return token
+                low += 1
+        return None
+
+    def close(self):
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+
+
+# mmap'e fork sonrası yazılmadığı için worker'lar aynı sayfaları paylaşabilir
+token_index_provider = providers.register("token_index", TokenIndex, close=lambda index: index.close(), fork_safe=True)
+
+
+def get_token_index() -> TokenIndex:
+    index = token_index_provider.get()
+    # Offline yeniden derlenen indeks en geç bir dakika içinde devreye girer
+    index.reload(min_interval=60)
+    return index
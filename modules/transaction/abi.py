@@ -0,0 +1,54 @@
+from typing import List
+
+import sha3
+
+
+def function_selector(signature: str) -> str:
+    """ör. "transfer(address,uint256)" -> "a9059cbb" """
+    return sha3.keccak_256(signature.encode()).hexdigest()[:8]
+
+
+TRANSFER = function_selector("transfer(address,uint256)")
+APPROVE = function_selector("approve(address,uint256)")
+BALANCE_OF = function_selector("balanceOf(address)")
+ALLOWANCE = function_selector("allowance(address,address)")
+DECIMALS = function_selector("decimals()")
+DISPERSE_ETHER = function_selector("disperseEther(address[],uint256[])")
+DISPERSE_TOKEN = function_selector("disperseToken(address,address[],uint256[])")
+
+
+def address_word(address: str) -> str:
+    return address.lower()[2:].rjust(64, "0")
+
+
+def uint_word(value: int) -> str:
+    return format(value, "064x")
+
+
+def encode_call(selector: str, *words: str) -> str:
+    """Sadece statik argümanlı çağrılar için calldata"""
+    return "0x" + selector + "".join(words)
+
+
+def encode_disperse(selector: str, head: List[str], recipients: List[str], amounts: List[int]) -> str:
+    """
+    (statik argümanlar..., address[], uint256[]) imzalı çağrılar için calldata.
+    Dinamik dizilerin offset'leri head'den sonra gelir.
+    """
+    count = len(recipients)
+    recipients_offset = 32 * (len(head) + 2)
+    amounts_offset = recipients_offset + 32 * (count + 1)
+    return "0x" + selector + "".join([
+        *head,
+        uint_word(recipients_offset),
+        uint_word(amounts_offset),
+        uint_word(count),
+        *(address_word(recipient) for recipient in recipients),
+        uint_word(count),
+        *(uint_word(amount) for amount in amounts),
+    ])
+
+
+def decode_uint(result: str) -> int:
+    # Boş dönüş ("0x") sözleşme olmayan adreslerde görülür
+    return int(result, 16) if result and result != "0x" else 0
@@ -0,0 +1,33 @@
+import requests
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import ORJSONResponse
+
+from modules.core.deadline import run_blocking
+from modules.core.providers import MissingEnvError
+from modules.rpc.jsonrpc import JsonRpcError
+from modules.transaction.dto.buildDto import BuildTransactionDto
+from modules.transaction.service import TransactionService
+
+router = APIRouter()
+
+
+@router.post("/build")
+async def build(request: BuildTransactionDto):
+    """
+    Merge/multisend için imzalanmaya hazır işlemleri, gas limitlerini ve toplam gas
+    maliyetini döndürür. Zincir sorguları iki JSON-RPC batch'inde yapılır (threadpool'da).
+    """
+    try:
+        return ORJSONResponse(await run_blocking(TransactionService.build, request))
+    except MissingEnvError as e:
+        # Değişken adı istemciye gösterilmez
+        print(f"❌ Hata - Transaction build yapılandırması eksik: {e}")
+        raise HTTPException(status_code=503, detail="Transaction service is not configured")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except JsonRpcError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    except requests.RequestException as e:
+        # Hata mesajı API anahtarlı RPC URL'ini içerebilir; sadece loglanır
+        print(f"❌ Hata - Transaction build RPC isteği: {e}")
+        raise HTTPException(status_code=502, detail="RPC request failed")
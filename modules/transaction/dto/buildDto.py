@@ -0,0 +1,9 @@
+from pydantic import BaseModel
+from typing import Any, Dict, Optional
+
+from modules.classes.service import TransactionData
+
+class BuildTransactionDto(BaseModel):
+    transaction_data: TransactionData
+    # /ai/chat'e gönderilen wallet_data ile aynı: adres -> token -> bilgiler (contractAddress, isNative, sortIndex...)
+    wallet_data: Optional[Dict[str, Dict[str, Dict[str, Any]]]] = None
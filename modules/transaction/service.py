@@ -0,0 +1,394 @@
+import os
+from decimal import Decimal, InvalidOperation
+from typing import Dict, List, Optional, Tuple
+
+from modules.core.address import ADDRESS_PATTERN, address_error
+from modules.multisend.service import SUM_CONTEXT
+from modules.rpc.jsonrpc import JsonRpcError, batch_call
+from modules.rpc.portfolio import format_units
+from modules.rpc.service import CHAIN_IDS, NATIVE_SYMBOLS, alchemy_url
+from modules.tokenlist.service import get_token_index
+from modules.transaction import abi
+from modules.transaction.dto.buildDto import BuildTransactionDto
+
+# Disperse sözleşmesi (tek işlemde çoklu transfer); zincirde kodu yoksa tekil transferler üretilir
+DISPERSE_CONTRACT = os.getenv("DISPERSE_CONTRACT", "0xD152f549545093347A162Dce210e7293f1452150")
+
+NATIVE_DECIMALS = 18
+NATIVE_TRANSFER_GAS = 21000
+# eth_maxPriorityFeePerGas desteklenmiyorsa kullanılan bahşiş (1.5 gwei)
+DEFAULT_PRIORITY_FEE = 1_500_000_000
+# approve henüz zincirde olmadığı için disperseToken simüle edilemez; kaba tahmin kullanılır
+DISPERSE_TOKEN_BASE_GAS = 60000
+DISPERSE_TOKEN_GAS_PER_RECIPIENT = 35000
+# approve(0) zincire girmeden sıfırdan farklı allowance'a approve simüle edilemez (USDT revert eder)
+APPROVE_GAS = 60000
+
+
+def parse_units(amount: str, decimals: int) -> int:
+    """Ondalık miktarı yuvarlama yapmadan en küçük birime (wei) çevirir"""
+    try:
+        value = Decimal(str(amount).strip())
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {amount}")
+    if not value.is_finite() or value < 0:
+        raise ValueError(f"Invalid amount: {amount}")
+    if value.as_tuple().exponent < -decimals:
+        raise ValueError(f"Amount {amount} has more than {decimals} decimal places")
+    return int(SUM_CONTEXT.scaleb(value, decimals))
+
+
+def with_gas_margin(estimate: int) -> int:
+    # Düz native transfer kesin 21000 harcar; sözleşme çağrılarına %20 pay eklenir
+    if estimate == NATIVE_TRANSFER_GAS:
+        return estimate
+    return -(-estimate * 12 // 10)
+
+
+def ordered_wallets(wallet_data: Dict[str, Dict[str, dict]]) -> List[Tuple[str, Dict[str, dict]]]:
+    """Cüzdanları sort_and_clean_wallet_data ile aynı sırada (ilk token'ın sortIndex'i) döndürür"""
+    def sort_key(item):
+        tokens = list(item[1].values())
+        return (tokens[0].get("sortIndex") or 0) if tokens else 0
+    return sorted(wallet_data.items(), key=sort_key)
+
+
+def resolve_token(chain_id: int, token_type: Optional[str], wallets) -> Tuple[str, Optional[str]]:
+    """(sembol, küçük harf sözleşme adresi) döndürür; native token için sözleşme None"""
+    symbol = (token_type or "").strip()
+    if not symbol:
+        raise ValueError("token_type is required")
+    if symbol.upper() == NATIVE_SYMBOLS.get(chain_id):
+        return symbol.upper(), None
+    for _, tokens in wallets:
+        for name, info in tokens.items():
+            token_symbol = info.get("symbol") or name
+            if token_symbol.upper() != symbol.upper():
+                continue
+            if info.get("isNative"):
+                return token_symbol, None
+            if info.get("contractAddress"):
+                return token_symbol, info["contractAddress"].lower()
+    if ADDRESS_PATTERN.match(symbol):
+        return symbol, symbol.lower()
+    token = get_token_index().by_symbol(chain_id, symbol)
+    if token is not None:
+        return token.symbol, token.contract
+    raise ValueError(f"Token {symbol} not found in wallet_data or the token list")
+
+
+def holds_token(tokens: Dict[str, dict], symbol: str, contract: Optional[str]) -> bool:
+    for name, info in tokens.items():
+        if contract is None:
+            if info.get("isNative") and (info.get("symbol") or name).upper() == symbol.upper():
+                return True
+        elif (info.get("contractAddress") or "").lower() == contract:
+            return True
+    return False
+
+
+def _checked(result):
+    if isinstance(result, JsonRpcError):
+        raise result
+    return result
+
+
+class WalletState:
+    __slots__ = ("nonce", "native_balance", "token_balance")
+
+    def __init__(self, nonce: int, native_balance: int, token_balance: int):
+        self.nonce = nonce
+        self.native_balance = native_balance
+        self.token_balance = token_balance
+
+
+class TransactionBuilder:
+    """
+    Merge ve multisend için imzalanmaya hazır transfer işlemlerini üretir.
+
+    Nonce, bakiye, decimals, allowance ve ücret bilgileri tek bir JSON-RPC batch'inde,
+    tüm işlemlerin eth_estimateGas çağrıları ikinci bir batch'te alınır; alıcı sayısından
+    bağımsız olarak iki istek yapılır. Birden fazla alıcılı multisend, zincirde Disperse
+    sözleşmesi varsa tek bir disperseEther/disperseToken çağrısına (gerekirse öncesinde
+    approve) paketlenir.
+    """
+
+    def __init__(self, chain_id: int, symbol: str, contract: Optional[str]):
+        self.chain_id = chain_id
+        self.symbol = symbol
+        self.contract = contract
+        self.url = alchemy_url(chain_id)
+        self.decimals = NATIVE_DECIMALS
+        # Token listesindeki token'ların decimals'ı zincirden sorulmaz
+        self.known_decimals = False
+        if contract:
+            token = get_token_index().by_contract(chain_id, contract)
+            if token is not None:
+                self.decimals, self.known_decimals = token.decimals, True
+        self.fee_fields: Dict[str, str] = {}
+        self.max_gas_price = 0
+        self.states: Dict[str, WalletState] = {}
+        self.disperse_available = False
+        self.allowance = 0
+        self.transactions: List[dict] = []
+        self.errors: List[str] = []
+
+    # --- Zincir durumu ---
+
+    def load_state(self, senders: List[str], disperse_owner: Optional[str] = None):
+        calls = [
+            ("eth_getBlockByNumber", ["latest", False]),
+            ("eth_gasPrice", []),
+            ("eth_maxPriorityFeePerGas", []),
+        ]
+        if self.contract and not self.known_decimals:
+            calls.append(("eth_call", [{"to": self.contract, "data": abi.encode_call(abi.DECIMALS)}, "latest"]))
+        for sender in senders:
+            calls.append(("eth_getTransactionCount", [sender, "pending"]))
+            calls.append(("eth_getBalance", [sender, "latest"]))
+            if self.contract:
+                data = abi.encode_call(abi.BALANCE_OF, abi.address_word(sender))
+                calls.append(("eth_call", [{"to": self.contract, "data": data}, "latest"]))
+        if disperse_owner:
+            calls.append(("eth_getCode", [DISPERSE_CONTRACT, "latest"]))
+            if self.contract:
+                data = abi.encode_call(abi.ALLOWANCE, abi.address_word(disperse_owner), abi.address_word(DISPERSE_CONTRACT))
+                calls.append(("eth_call", [{"to": self.contract, "data": data}, "latest"]))
+
+        results = iter(batch_call(self.url, calls, raise_errors=False))
+        block = _checked(next(results))
+        gas_price = int(_checked(next(results)), 16)
+        priority_fee = next(results)
+        if self.contract and not self.known_decimals:
+            self.decimals = abi.decode_uint(_checked(next(results)))
+
+        base_fee = (block or {}).get("baseFeePerGas")
+        if base_fee:
+            # EIP-1559: base fee iki katına kadar artsa da işlem geçerli kalır
+            priority = DEFAULT_PRIORITY_FEE if isinstance(priority_fee, JsonRpcError) else int(priority_fee, 16)
+            self.max_gas_price = 2 * int(base_fee, 16) + priority
+            self.fee_fields = {"type": "0x2", "maxFeePerGas": hex(self.max_gas_price), "maxPriorityFeePerGas": hex(priority)}
+        else:
+            self.max_gas_price = gas_price
+            self.fee_fields = {"type": "0x0", "gasPrice": hex(gas_price)}
+
+        for sender in senders:
+            nonce = int(_checked(next(results)), 16)
+            native_balance = int(_checked(next(results)), 16)
+            token_balance = abi.decode_uint(_checked(next(results))) if self.contract else native_balance
+            self.states[sender.lower()] = WalletState(nonce, native_balance, token_balance)
+
+        if disperse_owner:
+            self.disperse_available = _checked(next(results)) not in (None, "0x", "0x0")
+            if self.contract:
+                self.allowance = abi.decode_uint(_checked(next(results)))
+
+    # --- İşlem planlama ---
+
+    def _add(self, kind: str, sender: str, to: str, value: int, data: str, amount: int, recipient_count: int, gas: int = None):
+        state = self.states[sender.lower()]
+        self.transactions.append({
+            "kind": kind,
+            "from": sender,
+            "to": to,
+            "value": value,
+            "data": data,
+            "nonce": state.nonce,
+            "amount": amount,
+            "recipient_count": recipient_count,
+            "gas_estimate": gas,
+        })
+        state.nonce += 1
+
+    def _add_transfer(self, sender: str, recipient: str, amount: int):
+        if self.contract:
+            data = abi.encode_call(abi.TRANSFER, abi.address_word(recipient), abi.uint_word(amount))
+            self._add("transfer", sender, self.contract, 0, data, amount, 1)
+        else:
+            self._add("transfer", sender, recipient, amount, "0x", amount, 1)
+
+    def merge(self, senders: List[str], destination: str, amount: Optional[str]):
+        """Kaynak cüzdanların bakiyelerini hedefe toplar; amount verilmişse toplam onunla sınırlanır"""
+        self.load_state(senders)
+        remaining = parse_units(amount, self.decimals) if amount else None
+        for sender in senders:
+            if remaining is not None and remaining <= 0:
+                break
+            state = self.states[sender.lower()]
+            if self.contract:
+                available = state.token_balance
+            else:
+                # Native bakiyenin gas ücreti kadarı cüzdanda bırakılır
+                available = state.native_balance - NATIVE_TRANSFER_GAS * self.max_gas_price
+            if available <= 0:
+                continue
+            value = available if remaining is None else min(available, remaining)
+            self._add_transfer(sender, destination, value)
+            if remaining is not None:
+                remaining -= value
+        if remaining:
+            self.errors.append(f"Insufficient balance: {format_units(remaining, self.decimals)} {self.symbol} short of merge amount")
+        if not self.transactions and not self.errors:
+            self.errors.append(f"No wallet has a {self.symbol} balance to merge")
+
+    def multisend(self, sender: str, recipients: List[Tuple[str, str]]):
+        self.load_state([sender], disperse_owner=sender if len(recipients) > 1 else None)
+        amounts = [(address, parse_units(amount, self.decimals)) for address, amount in recipients]
+        total = sum(amount for _, amount in amounts)
+        balance = self.states[sender.lower()].token_balance
+        if total > balance:
+            self.errors.append(
+                f"Insufficient balance: {format_units(total, self.decimals)} {self.symbol} required, "
+                f"{format_units(balance, self.decimals)} available"
+            )
+
+        if not self.disperse_available:
+            for address, amount in amounts:
+                self._add_transfer(sender, address, amount)
+            return
+
+        addresses = [address for address, _ in amounts]
+        values = [amount for _, amount in amounts]
+        if not self.contract:
+            data = abi.encode_disperse(abi.DISPERSE_ETHER, [], addresses, values)
+            self._add("disperseEther", sender, DISPERSE_CONTRACT, total, data, total, len(amounts))
+            return
+
+        gas = None
+        if self.allowance < total:
+            approve_gas = None
+            if self.allowance > 0:
+                # USDT gibi token'lar sıfırdan farklı allowance'ın doğrudan değiştirilmesine izin vermez; önce sıfırlanır
+                data = abi.encode_call(abi.APPROVE, abi.address_word(DISPERSE_CONTRACT), abi.uint_word(0))
+                self._add("approve", sender, self.contract, 0, data, 0, 0)
+                approve_gas = APPROVE_GAS
+            data = abi.encode_call(abi.APPROVE, abi.address_word(DISPERSE_CONTRACT), abi.uint_word(total))
+            self._add("approve", sender, self.contract, 0, data, total, 0, approve_gas)
+            gas = DISPERSE_TOKEN_BASE_GAS + DISPERSE_TOKEN_GAS_PER_RECIPIENT * len(amounts)
+        data = abi.encode_disperse(abi.DISPERSE_TOKEN, [abi.address_word(self.contract)], addresses, values)
+        self._add("disperseToken", sender, DISPERSE_CONTRACT, 0, data, total, len(amounts), gas)
+
+    # --- Gas tahmini ---
+
+    def estimate(self):
+        pending = [tx for tx in self.transactions if tx["gas_estimate"] is None]
+        if pending:
+            calls = [
+                ("eth_estimateGas", [{"from": tx["from"], "to": tx["to"], "value": hex(tx["value"]), "data": tx["data"]}])
+                for tx in pending
+            ]
+            for tx, result in zip(pending, batch_call(self.url, calls, raise_errors=False)):
+                if isinstance(result, JsonRpcError):
+                    tx["error"] = f"Gas estimation failed: {result.error}"
+                    continue
+                tx["gas_estimate"] = int(result, 16)
+                tx["gas_source"] = "eth_estimateGas"
+
+        # Gönderenin native bakiyesi işlem değerleri ve gas ücretlerini karşılamalı
+        spent: Dict[str, int] = {}
+        for tx in self.transactions:
+            if tx["gas_estimate"] is None:
+                continue
+            if "gas_source" in tx:
+                tx["gas_limit"] = with_gas_margin(tx["gas_estimate"])
+            else:
+                # Kaba tahmin zaten üst sınır olarak seçildi, ek pay eklenmez
+                tx["gas_source"] = "heuristic"
+                tx["gas_limit"] = tx["gas_estimate"]
+            if tx["kind"] == "transfer" and not self.contract and tx["gas_limit"] > NATIVE_TRANSFER_GAS:
+                tx["error"] = "Destination is a contract; native sweep does not reserve enough gas"
+            sender = tx["from"].lower()
+            spent[sender] = spent.get(sender, 0) + tx["value"] + tx["gas_limit"] * self.max_gas_price
+            if spent[sender] > self.states[sender].native_balance and "error" not in tx:
+                tx["error"] = f"Insufficient {NATIVE_SYMBOLS.get(self.chain_id, 'native')} balance for gas"
+
+    def result(self, transaction_type: str) -> dict:
+        native_symbol = NATIVE_SYMBOLS.get(self.chain_id, "NATIVE")
+        transactions = []
+        total_gas = 0
+        for tx in self.transactions:
+            gas_limit = tx.get("gas_limit")
+            if gas_limit:
+                total_gas += gas_limit
+            transactions.append({
+                "kind": tx["kind"],
+                "chainId": hex(self.chain_id),
+                "from": tx["from"],
+                "to": tx["to"],
+                "value": hex(tx["value"]),
+                "data": tx["data"],
+                "nonce": hex(tx["nonce"]),
+                "gasLimit": hex(gas_limit) if gas_limit else None,
+                **self.fee_fields,
+                "gas_source": tx.get("gas_source"),
+                "amount": format_units(tx["amount"], self.decimals),
+                "recipient_count": tx["recipient_count"],
+                "error": tx.get("error"),
+            })
+        total_cost = total_gas * self.max_gas_price
+        has_errors = bool(self.errors) or any(tx["error"] for tx in transactions)
+        return {
+            "status": "error" if has_errors else "success",
+            "transaction_type": transaction_type,
+            "chain_id": self.chain_id,
+            "token": {"symbol": self.symbol, "contractAddress": self.contract, "decimals": self.decimals, "isNative": self.contract is None},
+            "transactions": transactions,
+            "total_amount": format_units(sum(tx["amount"] for tx in self.transactions if tx["kind"] != "approve"), self.decimals),
+            "total_gas_limit": total_gas,
+            "max_gas_cost_wei": str(total_cost),
+            "max_gas_cost": f"{format_units(total_cost, NATIVE_DECIMALS)} {native_symbol}",
+            "errors": self.errors,
+        }
+
+
+class TransactionService:
+    def build(request: BuildTransactionDto) -> dict:
+        """TransactionData (merge/multisend) ve wallet_data'dan imzalanmaya hazır işlemler üretir"""
+        data = request.transaction_data
+        transaction_type = (data.transaction_type or "").strip().lower()
+        if transaction_type not in ("merge", "multisend"):
+            raise ValueError("Only merge and multisend transactions can be built")
+
+        chain_id = CHAIN_IDS.get((data.chain or "").strip().lower())
+        if chain_id is None:
+            raise ValueError(f"Unsupported chain: {data.chain}")
+
+        wallets = ordered_wallets(request.wallet_data or {})
+        symbol, contract = resolve_token(chain_id, data.token_type, wallets)
+        builder = TransactionBuilder(chain_id, symbol, contract)
+
+        if transaction_type == "merge":
+            destination = (data.destination_wallet_address or "").strip()
+            error = address_error(destination)
+            if error:
+                raise ValueError(f"destination_wallet_address: {error}")
+            others = [address for address, _ in wallets if address.lower() != destination.lower()]
+            senders = [address for address, tokens in wallets if address in others and holds_token(tokens, symbol, contract)]
+            if not senders and not others:
+                raise ValueError("wallet_data has no source wallets to merge from")
+            # wallet_data'da token görünmüyorsa tüm cüzdanların zincirdeki bakiyesine bakılır
+            builder.merge(senders or others, destination, data.merge_amount)
+        else:
+            recipients = []
+            for wallet in data.multi_send_wallets or []:
+                address = wallet.destination_wallet_address.strip()
+                error = address_error(address)
+                if error:
+                    raise ValueError(f"{address}: {error}")
+                recipients.append((address, wallet.destination_wallet_amount))
+            if not recipients:
+                raise ValueError("multi_send_wallets is required")
+
+            sender = (data.source_wallet_address or "").strip()
+            if not sender:
+                holders = [address for address, tokens in wallets if holds_token(tokens, symbol, contract)]
+                if not holders:
+                    raise ValueError("source_wallet_address is required")
+                sender = holders[0]
+            error = address_error(sender)
+            if error:
+                raise ValueError(f"source_wallet_address: {error}")
+            builder.multisend(sender, recipients)
+
+        builder.estimate()
+        return builder.result(transaction_type)
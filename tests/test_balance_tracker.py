@@ -0,0 +1,117 @@
+import pytest
+
+from benchmarks.fakes import FakeUpstreams, wallet_address
+from modules.rpc.balance_tracker import BalanceTracker
+
+NEW_TOKEN = "0x" + "ab" * 20
+COUNTERPARTY = "0x" + "cd" * 20
+
+
+class RecordingTracker(BalanceTracker):
+    """Tam senkronizasyon sebeplerini kaydeder"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.full_syncs = []
+
+    def _full_sync(self, chain, wallet, address, url, timeout, reason):
+        self.full_syncs.append(reason)
+        return super()._full_sync(chain, wallet, address, url, timeout, reason)
+
+
+@pytest.fixture
+def fake():
+    with FakeUpstreams() as upstreams:
+        yield upstreams
+
+
+@pytest.fixture
+def url(fake):
+    return f"{fake.base_url}/alchemy/eth-mainnet/v2/test"
+
+
+def fresh_balances(url, address):
+    """alchemy_getTokenBalances ile baştan alınan bakiyeler (beklenen sonuç)"""
+    return BalanceTracker().refresh(1, address, url)[1]
+
+
+def test_incremental_transfer(fake, url):
+    address = wallet_address(3, 1)
+    tracker = RecordingTracker()
+    tracker.refresh(1, address, url)
+    contract, _ = fake.universe.wallet_tokens(address)[0]
+
+    fake.mine_transfer(contract, COUNTERPARTY, address, 500)
+    fake.mine_transfer(contract, address, COUNTERPARTY, 200)
+    _, balances = tracker.refresh(1, address, url)
+
+    assert tracker.full_syncs == ["initial"]
+    assert balances == fresh_balances(url, address)
+
+
+def test_unchanged_head(fake, url):
+    address = wallet_address(3, 2)
+    tracker = RecordingTracker()
+    _, first = tracker.refresh(1, address, url)
+    _, second = tracker.refresh(1, address, url)
+
+    assert tracker.full_syncs == ["initial"]
+    assert first == second
+
+
+def test_receive_then_spend(fake, url):
+    address = wallet_address(2, 3)
+    tracker = RecordingTracker()
+    tracker.refresh(1, address, url)
+
+    # Aynı aralıkta alınıp kısmen harcanan yeni token
+    fake.mine_transfer(NEW_TOKEN, COUNTERPARTY, address, 1000)
+    fake.mine_transfer(NEW_TOKEN, address, COUNTERPARTY, 400)
+    _, balances = tracker.refresh(1, address, url)
+    assert balances[NEW_TOKEN] == 600
+
+    # Tamamı harcanan token bakiyelerden düşer
+    fake.mine_transfer(NEW_TOKEN, COUNTERPARTY, address, 50)
+    fake.mine_transfer(NEW_TOKEN, address, COUNTERPARTY, 650)
+    _, balances = tracker.refresh(1, address, url)
+
+    assert NEW_TOKEN not in balances
+    assert tracker.full_syncs == ["initial"]
+    assert balances == fresh_balances(url, address)
+
+
+def test_missing_logs_force_resync(fake, url):
+    address = wallet_address(2, 4)
+    tracker = RecordingTracker()
+    tracker.refresh(1, address, url)
+
+    # Takip edilmeyen bir token'ın harcanması (ör. eksik log) negatif bakiye üretir
+    fake.mine_transfer(NEW_TOKEN, address, COUNTERPARTY, 10)
+    tracker.refresh(1, address, url)
+
+    assert tracker.full_syncs == ["initial", "inconsistent"]
+
+
+def test_reorg_forces_resync(fake, url):
+    address = wallet_address(3, 5)
+    tracker = RecordingTracker()
+    tracker.refresh(1, address, url)
+    contract, _ = fake.universe.wallet_tokens(address)[0]
+
+    fake.mine_transfer(contract, COUNTERPARTY, address, 7)
+    fake.reorg()
+    _, balances = tracker.refresh(1, address, url)
+
+    assert tracker.full_syncs == ["initial", "reorg"]
+    assert balances == fresh_balances(url, address)
+
+
+def test_block_gap_forces_resync(fake, url):
+    address = wallet_address(3, 6)
+    tracker = RecordingTracker(max_block_gap=10)
+    tracker.refresh(1, address, url)
+
+    fake.mine_blocks(11)
+    tracker.refresh(1, address, url)
+
+    assert tracker.full_syncs == ["initial", "gap"]
@@ -0,0 +1,95 @@
+import pytest
+
+from modules.core.address import address_error, to_checksum_address
+from modules.multisend.service import MultisendCsvParser
+
+# EIP-55 örnek adresleri
+CHECKSUMMED = [
+    "0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAed",
+    "0xfB6916095ca1df60bB79Ce92cE3Ea74c37c5d359",
+    "0xdbF03B407c01E7cD3CBea99509d93f8DDDC8C6FB",
+    "0xD1220A0cf47c7B9Be7A2E6BA89F429762e7b9aDb",
+]
+
+
+def parse(text: str, chunk_size: int = 7, **kwargs) -> dict:
+    """Satırların parça sınırlarında bölünmesi için gövde küçük parçalarla verilir"""
+    parser = MultisendCsvParser(**kwargs)
+    data = text.encode()
+    for start in range(0, len(data), chunk_size):
+        parser.feed(data[start:start + chunk_size])
+    return parser.finish()
+
+
+@pytest.mark.parametrize("address", CHECKSUMMED)
+def test_checksum_address(address):
+    assert to_checksum_address(address.lower()) == address
+    assert address_error(address) is None
+
+
+def test_address_error():
+    address = CHECKSUMMED[0]
+    assert address_error(address.lower()) is None
+    assert address_error("0x" + address[2:].upper()) is None
+    assert address_error(address[:-1] + address[-1].swapcase()) == "invalid address checksum"
+    assert address_error(address[:-1]) == "invalid address format"
+    assert address_error("0x" + "g" * 40) == "invalid address format"
+
+
+def test_exact_decimal_sum():
+    rows = [f"{CHECKSUMMED[0]},12345678901234.123456789012345678", f"{CHECKSUMMED[1]},0.000000000000000001"]
+    result = parse("\n".join(rows) + "\n")
+    assert result["status"] == "success"
+    assert result["multisend_amount"] == "12345678901234.123456789012345679"
+
+
+def test_duplicates_are_merged():
+    text = f"{CHECKSUMMED[0]},1.5\r\n{CHECKSUMMED[1]},2\r\n{CHECKSUMMED[0].lower()},0.25\r\n"
+    result = parse(text)
+    assert result["recipient_count"] == 2
+    assert result["multi_send_wallets"] == [
+        {"destination_wallet_address": CHECKSUMMED[0], "destination_wallet_amount": "1.75"},
+        {"destination_wallet_address": CHECKSUMMED[1], "destination_wallet_amount": "2"},
+    ]
+    assert result["duplicate_count"] == 1
+    assert result["duplicates"] == [{"row": 3, "address": CHECKSUMMED[0].lower()}]
+    assert result["multisend_amount"] == "3.75"
+
+
+def test_header_and_blank_lines_are_skipped():
+    text = f"﻿address,amount\n{CHECKSUMMED[0]},1\n\n , \n{CHECKSUMMED[1]},2"
+    result = parse(text)
+    assert result["status"] == "success"
+    assert result["row_count"] == 5
+    assert result["recipient_count"] == 2
+
+
+def test_header_only_allowed_on_first_row():
+    result = parse(f"{CHECKSUMMED[0]},1\naddress,amount\n")
+    assert result["errors"] == [{"row": 2, "error": "invalid address format", "value": "address"}]
+
+
+def test_quoted_lines():
+    text = f'"{CHECKSUMMED[0]}","1,5"\n"{CHECKSUMMED[1]}","2"\n'
+    result = parse(text)
+    assert result["errors"] == [{"row": 1, "error": "invalid amount", "value": "1,5"}]
+    assert result["multi_send_wallets"] == [{"destination_wallet_address": CHECKSUMMED[1], "destination_wallet_amount": "2"}]
+
+
+def test_invalid_rows():
+    text = "\n".join([
+        f"{CHECKSUMMED[0][:-1]}{CHECKSUMMED[0][-1].swapcase()},1",
+        f"{CHECKSUMMED[1]},-1",
+        f"{CHECKSUMMED[2]},1.123",
+        f"{CHECKSUMMED[3]},1e-3",
+        f"{CHECKSUMMED[3]}",
+    ])
+    result = parse(text, decimals=2)
+    assert [error["error"] for error in result["errors"]] == [
+        "invalid address checksum",
+        "amount must be positive",
+        "amount has more than 2 decimal places",
+        "amount has more than 2 decimal places",
+        "expected address and amount columns",
+    ]
+    assert result["status"] == "error"
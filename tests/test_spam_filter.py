@@ -0,0 +1,92 @@
+import io
+
+import pytest
+
+from modules.rpc import spam_filter
+from modules.rpc.spam_filter import RECORD_SIZE, ContractSet, _merge_sorted, _record
+
+TODAY = 20000
+
+
+def address(n: int) -> str:
+    return "0x" + f"{n:040x}"
+
+
+def key(n: int) -> bytes:
+    return bytes.fromhex(f"{n:040x}")
+
+
+def merge(existing, pending, min_day=None) -> list:
+    out = io.BytesIO()
+    _merge_sorted(existing, pending, out, min_day)
+    data = out.getvalue()
+    return [(data[i:i + 20], int.from_bytes(data[i + 20:i + RECORD_SIZE], "big")) for i in range(0, len(data), RECORD_SIZE)]
+
+
+@pytest.fixture(autouse=True)
+def today(monkeypatch):
+    day = {"value": TODAY}
+    monkeypatch.setattr(spam_filter, "_today", lambda: day["value"])
+    return day
+
+
+def test_merge_into_empty():
+    pending = sorted(_record(key(n), TODAY) for n in (5, 1, 3))
+    assert merge(None, pending) == [(key(1), TODAY), (key(3), TODAY), (key(5), TODAY)]
+
+
+def test_merge_keeps_order_and_skips_duplicates():
+    existing = b"".join(_record(key(n), TODAY - 1) for n in (2, 4, 6))
+    pending = sorted(_record(key(n), TODAY) for n in (1, 4, 7))
+    assert merge(existing, pending) == [
+        (key(1), TODAY), (key(2), TODAY - 1), (key(4), TODAY), (key(6), TODAY - 1), (key(7), TODAY),
+    ]
+
+
+def test_merge_copies_across_chunks(monkeypatch):
+    monkeypatch.setattr(spam_filter, "MERGE_CHUNK_SIZE", 3 * RECORD_SIZE)
+    existing = b"".join(_record(key(n), TODAY) for n in range(0, 20, 2))
+    pending = [_record(key(11), TODAY)]
+    assert [k for k, _ in merge(existing, pending)] == sorted([key(n) for n in range(0, 20, 2)] + [key(11)])
+
+
+def test_merge_drops_expired():
+    existing = b"".join(_record(key(n), day) for n, day in ((1, TODAY - 40), (2, TODAY - 5), (3, TODAY - 40)))
+    pending = [_record(key(3), TODAY)]
+    assert merge(existing, pending, min_day=TODAY - 29) == [(key(2), TODAY - 5), (key(3), TODAY)]
+
+
+def test_contract_set_flush_and_contains(tmp_path):
+    contract_set = ContractSet(str(tmp_path / "1.v2.bin"))
+    contract_set.add(address(7))
+    assert contract_set.contains(address(7))
+
+    contract_set.flush()
+    assert not contract_set.pending
+    assert contract_set.contains(address(7))
+    assert contract_set.contains(address(7).upper().replace("0X", "0x"))
+    assert not contract_set.contains(address(8))
+    assert not contract_set.contains("not-an-address")
+
+    # Aynı dosyayı açan başka bir worker diskteki kaydı görür
+    assert ContractSet(contract_set.path).contains(address(7))
+
+
+def test_contract_set_expires_entries(tmp_path, today):
+    contract_set = ContractSet(str(tmp_path / "1.v2.bin"), ttl_days=30)
+    contract_set.add(address(1))
+    contract_set.flush()
+
+    today["value"] = TODAY + 29
+    assert contract_set.contains(address(1))
+    today["value"] = TODAY + 30
+    assert not contract_set.contains(address(1))
+
+    # Tekrar eklenen sözleşmenin günü yenilenir, süresi dolan diğerleri dosyadan silinir
+    contract_set.add(address(2))
+    contract_set.flush()
+    assert len(ContractSet(contract_set.path)) == 1
+    contract_set.add(address(1))
+    contract_set.flush()
+    today["value"] = TODAY + 59
+    assert contract_set.contains(address(1))